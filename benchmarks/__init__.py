@@ -0,0 +1,12 @@
+# benchmarks
+# Synthetic dataset generator (seed.py) and an in-process benchmark runner
+# (run.py) that drives the API with httpx against that dataset. Both read the
+# database location from MENTALHEALTH_DATABASE_URL like the app itself, or
+# from --database-url, which must be handled before the app is imported.
+import os
+
+
+def use_database(url):
+    """Point the app at url; call before anything from mentalhealth_app is imported."""
+    if url:
+        os.environ["MENTALHEALTH_DATABASE_URL"] = url
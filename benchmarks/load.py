@@ -0,0 +1,326 @@
+# load.py
+# Load generator for a running server (launch.bat, or uvicorn directly).
+# Replays a weighted mix of user actions in steps of rising load and reports,
+# per step, throughput, error rate and latency percentiles - the degradation
+# curve - together with SQLite lock errors and time spent in SQL, read from the
+# server's /metrics before and after each step.
+#
+# Steps are either closed-loop concurrency levels (N virtual users, each
+# sending its next request as soon as the last one finished) or open-loop
+# target request rates (requests arrive at the given rate whether or not the
+# server keeps up, which is what exposes queueing):
+#
+#   uvicorn mentalhealth_app.business.app:app --port 8000
+#   python -m benchmarks.load --concurrency 1,4,16,64 --duration 20
+#   python -m benchmarks.load --rate 25,50,100,200 --mix write-heavy
+#   python -m benchmarks.load --mix mood=5,insights=2,mood_chart=1
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import httpx
+
+from .run import percentile
+from .seed import PASSWORD
+
+MIXES = {
+    # Many users logging while others browse charts and insights
+    "mixed": {
+        "login": 1, "mood": 4, "activity": 2, "journal": 1,
+        "mood_history": 3, "activity_history": 1, "journal_history": 1,
+        "insights": 2, "mood_chart": 1, "mood_chart_png": 0.5,
+    },
+    "write-heavy": {
+        "login": 1, "mood": 8, "activity": 4, "journal": 2, "mood_history": 1, "insights": 1,
+    },
+    "read-heavy": {
+        "login": 1, "mood": 1, "mood_history": 4, "activity_history": 1, "journal_history": 1,
+        "insights": 4, "mood_chart": 3, "mood_chart_png": 1,
+    },
+}
+WRITES = {"mood", "activity", "journal"}
+# History each fresh load-test user starts with, so insights and charts have data
+PRELOADED_DAYS = 60
+
+
+class LoadUser:
+    def __init__(self, username, headers):
+        self.username = username
+        self.headers = headers
+
+
+async def action(client, name, user, rng):
+    """Send one request for the named action; returns the response."""
+    headers = user.headers
+    if name == "login":
+        return await client.post("/login", data={"username": user.username, "password": PASSWORD})
+    if name == "mood":
+        return await client.post("/mood", data={"score": rng.randint(1, 10), "notes": "load test"}, headers=headers)
+    if name == "activity":
+        return await client.post(
+            "/activity", data={"activity": rng.choice(("Walking", "Running", "Yoga")), "duration": 30}, headers=headers
+        )
+    if name == "journal":
+        return await client.post("/journal", data={"entry": "Load test journal entry"}, headers=headers)
+    if name in ("mood_history", "activity_history", "journal_history"):
+        return await client.get(f"/{name}", headers=headers)
+    if name == "insights":
+        return await client.get(f"/insights/{user.username}", headers=headers)
+    if name == "mood_chart":
+        return await client.get(f"/mood_chart/{user.username}", headers=headers)
+    if name == "mood_chart_png":
+        return await client.get(f"/mood_chart/{user.username}", params={"format": "png"}, headers=headers)
+    raise ValueError(f"Unknown action {name!r}")
+
+
+def parse_mix(text):
+    if text in MIXES:
+        return MIXES[text]
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - set().union(*MIXES.values())
+    if unknown:
+        raise SystemExit(f"Unknown actions in mix: {', '.join(sorted(unknown))}")
+    return mix
+
+
+async def prepare_users(client, count, prefix, run_id):
+    """Log in as seeded users (with --prefix) or register fresh ones with some history."""
+    users = []
+    for index in range(count):
+        username = f"{prefix}{index:06d}" if prefix else f"load-{run_id}-{index}"
+        if not prefix:
+            (await client.post("/register", data={"username": username, "password": PASSWORD})).raise_for_status()
+        response = await client.post("/login", data={"username": username, "password": PASSWORD})
+        response.raise_for_status()
+        user = LoadUser(username, {"Authorization": f"Bearer {response.json()['access_token']}"})
+        if not prefix:
+            now = datetime.utcnow()
+            items = [
+                {"type": "mood", "idempotency_key": f"preload-{day}", "score": 1 + (day * 7) % 10,
+                 "created_at": (now - timedelta(days=day)).isoformat()}
+                for day in range(PRELOADED_DAYS)
+            ]
+            (await client.post("/batch", json=items, headers=user.headers)).raise_for_status()
+        users.append(user)
+    return users
+
+
+async def scrape(client):
+    """Sum of each metric on /metrics across labels (lock errors keyed separately), or None."""
+    try:
+        response = await client.get("/metrics")
+    except httpx.HTTPError:
+        return None
+    if response.status_code != 200:
+        return None
+    totals = defaultdict(float)
+    for line in response.text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        series, _, value = line.rpartition(" ")
+        name = series.split("{", 1)[0]
+        if name == "mentalhealth_db_errors_total":
+            name += ":" + series.split('kind="', 1)[1].split('"', 1)[0]
+        totals[name] += float(value)
+    return totals
+
+
+class StepStats:
+    def __init__(self):
+        self.latencies = defaultdict(list)  # action -> seconds of successful requests
+        self.outcomes = defaultdict(lambda: defaultdict(int))  # action -> outcome -> count
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.dropped = 0
+
+    async def timed(self, client, name, user, rng):
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        started = time.perf_counter()
+        try:
+            response = await action(client, name, user, rng)
+            outcome = str(response.status_code)
+        except httpx.TimeoutException:
+            outcome = "timeout"
+        except httpx.HTTPError:
+            outcome = "connection"
+        finally:
+            self.in_flight -= 1
+        elapsed = time.perf_counter() - started
+        self.outcomes[name][outcome] += 1
+        if outcome.startswith(("2", "3")):
+            self.latencies[name].append(elapsed)
+
+
+async def closed_loop(client, users, mix, concurrency, duration, rng, stats):
+    names, weights = list(mix), list(mix.values())
+    deadline = time.perf_counter() + duration
+
+    async def virtual_user():
+        while time.perf_counter() < deadline:
+            await stats.timed(client, rng.choices(names, weights)[0], rng.choice(users), rng)
+
+    await asyncio.gather(*(virtual_user() for _ in range(concurrency)))
+
+
+async def open_loop(client, users, mix, rate, duration, rng, stats, max_in_flight):
+    names, weights = list(mix), list(mix.values())
+    loop = asyncio.get_running_loop()
+    tasks = set()
+    next_at = loop.time()
+    deadline = next_at + duration
+    while next_at < deadline:
+        await asyncio.sleep(max(0.0, next_at - loop.time()))
+        if stats.in_flight >= max_in_flight:
+            # The server has fallen this far behind; count instead of piling on
+            stats.dropped += 1
+        else:
+            task = asyncio.create_task(stats.timed(client, rng.choices(names, weights)[0], rng.choice(users), rng))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        # Poisson arrivals
+        next_at += rng.expovariate(rate)
+    if tasks:
+        await asyncio.gather(*tasks)
+
+
+def summarize(label, stats, wall, before, after):
+    all_latencies = sorted(l for values in stats.latencies.values() for l in values)
+    write_latencies = sorted(l for name in WRITES for l in stats.latencies.get(name, ()))
+    read_latencies = sorted(l for name, values in stats.latencies.items() if name not in WRITES for l in values)
+    total = sum(sum(outcomes.values()) for outcomes in stats.outcomes.values())
+    failed = sum(
+        count for outcomes in stats.outcomes.values() for outcome, count in outcomes.items()
+        if not outcome.startswith(("2", "3"))
+    )
+
+    def ms(values, pct):
+        value = percentile(values, pct)
+        return round(value * 1000, 1) if value is not None else None
+
+    server = None
+    if before is not None and after is not None:
+        delta = {key: after.get(key, 0) - before.get(key, 0) for key in after}
+        server = {
+            "lock_errors": int(delta.get("mentalhealth_db_errors_total:locked", 0)),
+            "other_db_errors": int(delta.get("mentalhealth_db_errors_total:other", 0)),
+            "queries": int(delta.get("mentalhealth_db_queries_total", 0)),
+            "sql_seconds": round(delta.get("mentalhealth_db_query_seconds_total", 0), 3),
+        }
+    return {
+        "step": label,
+        "requests": total,
+        "throughput_rps": round(total / wall, 1),
+        "error_rate": round(failed / total, 4) if total else 0.0,
+        "peak_in_flight": stats.peak_in_flight,
+        "dropped": stats.dropped,
+        "p50_ms": ms(all_latencies, 50),
+        "p95_ms": ms(all_latencies, 95),
+        "p99_ms": ms(all_latencies, 99),
+        "write_p95_ms": ms(write_latencies, 95),
+        "read_p95_ms": ms(read_latencies, 95),
+        "server": server,
+        "actions": {
+            name: {
+                "outcomes": dict(stats.outcomes[name]),
+                "p50_ms": ms(sorted(stats.latencies[name]), 50),
+                "p95_ms": ms(sorted(stats.latencies[name]), 95),
+            }
+            for name in sorted(stats.outcomes)
+        },
+    }
+
+
+HEADER = (
+    f"{'step':>10} {'req/s':>8} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+    f"{'write95':>8} {'read95':>8} {'locked':>7} {'SQL s':>7}"
+)
+
+
+def _cell(value, width, fmt=""):
+    return f"{'-':>{width}}" if value is None else f"{value:>{width}{fmt}}"
+
+
+def _row(result):
+    server = result["server"] or {}
+    return (
+        f"{result['step']:>10} {result['throughput_rps']:>8.1f} {result['error_rate']:>7.1%} "
+        f"{_cell(result['p50_ms'], 8, '.1f')} {_cell(result['p95_ms'], 8, '.1f')} {_cell(result['p99_ms'], 8, '.1f')} "
+        f"{_cell(result['write_p95_ms'], 8, '.1f')} {_cell(result['read_p95_ms'], 8, '.1f')} "
+        f"{_cell(server.get('lock_errors'), 7)} {_cell(server.get('sql_seconds'), 7, '.2f')}"
+    )
+
+
+async def main_async(args):
+    mix = parse_mix(args.mix)
+    rng = random.Random(args.seed)
+    if args.rate:
+        steps = [("rate", float(value)) for value in args.rate.split(",")]
+    else:
+        steps = [("concurrency", int(value)) for value in args.concurrency.split(",")]
+    most = max(value for _, value in steps) if not args.rate else args.max_in_flight
+    limits = httpx.Limits(max_connections=int(most) + 4, max_keepalive_connections=int(most) + 4)
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        users = await prepare_users(client, args.users, args.prefix, uuid.uuid4().hex[:8])
+        print(f"{len(users)} users, mix {mix}, {args.duration:g}s per step against {args.url}")
+        print(HEADER)
+        results = []
+        for kind, value in steps:
+            stats = StepStats()
+            before = await scrape(client)
+            started = time.perf_counter()
+            if kind == "rate":
+                await open_loop(client, users, mix, value, args.duration, rng, stats, args.max_in_flight)
+                label = f"{value:g}/s"
+            else:
+                await closed_loop(client, users, mix, value, args.duration, rng, stats)
+                label = f"c={value}"
+            wall = time.perf_counter() - started
+            result = summarize(label, stats, wall, before, await scrape(client))
+            results.append(result)
+            print(_row(result), flush=True)
+            if args.pause:
+                await asyncio.sleep(args.pause)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test a running server with a weighted traffic mix")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--mix", default="mixed", help=f"one of {', '.join(MIXES)} or e.g. mood=5,insights=2")
+    parser.add_argument("--concurrency", default="1,4,16,64", help="closed-loop steps: virtual users per step")
+    parser.add_argument("--rate", help="open-loop steps instead: target requests per second per step")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="open loop: drop arrivals beyond this")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per step")
+    parser.add_argument("--pause", type=float, default=1.0, help="seconds between steps")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--prefix", help="use users seeded by benchmarks.seed (e.g. bench) instead of registering new ones")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write every step, with per-action detail, as JSON")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(main_async(args))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "steps": results}, f, indent=2)
+
+    first = results[0]
+    for result in results[1:]:
+        if first["p95_ms"] and result["p95_ms"]:
+            print(f"{result['step']:>10}: p95 x{result['p95_ms'] / first['p95_ms']:.1f} vs {first['step']}")
+    return 1 if any(result["error_rate"] for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
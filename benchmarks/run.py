@@ -0,0 +1,268 @@
+# run.py
+# Drives every scenario in scenarios.py against the app in-process (httpx's
+# ASGI transport - no server or network in the numbers) and reports latency
+# percentiles, throughput and Python memory per scenario. Results can be
+# saved as a baseline; later runs are compared against it and exit non-zero
+# when a scenario got slower, allocates more or starts failing.
+#
+#   python -m benchmarks.seed --users 200 --days 365
+#   python -m benchmarks.run --save-baseline            # on the known-good commit
+#   python -m benchmarks.run                            # after a change
+#   python -m benchmarks.run --only insights,trends_all --requests 500
+#
+# Baselines are only comparable on the same machine, dataset and options.
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import uuid
+
+from benchmarks import use_database
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# p99 of a few hundred requests is close to the maximum - too noisy to fail on
+GATED_PERCENTILES = ("p50_ms", "p95_ms")
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)]
+
+
+async def measure(client, scenario, ctx, requests, concurrency, warmup, memory_requests):
+    if scenario.prepare:
+        await scenario.prepare(client, ctx, warmup + requests + memory_requests)
+
+    calls = itertools.count()
+    for _ in range(warmup):
+        await scenario.call(client, ctx, next(calls))
+
+    latencies, statuses = [], {}
+
+    async def worker(numbers):
+        for _ in numbers:
+            i = next(calls)
+            started = time.perf_counter()
+            response = await scenario.call(client, ctx, i)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    workers = 1 if scenario.serial else concurrency
+    shares = [range(requests // workers + (w < requests % workers)) for w in range(workers)]
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(share) for share in shares))
+    wall = time.perf_counter() - started
+
+    # Memory in a separate, sequential pass: tracing slows every allocation down
+    peak_kib = None
+    if memory_requests:
+        tracemalloc.start()
+        try:
+            for _ in range(memory_requests):
+                await scenario.call(client, ctx, next(calls))
+            peak_kib = tracemalloc.get_traced_memory()[1] / 1024
+        finally:
+            tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "concurrency": workers,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3),
+        "throughput_rps": round(len(latencies) / wall, 1),
+        "peak_kib": round(peak_kib, 1) if peak_kib is not None else None,
+        "errors": sum(count for code, count in statuses.items() if code not in scenario.expected),
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+
+async def _dataset(prefix):
+    from sqlalchemy import func, select
+
+    from mentalhealth_app.business.models import ActivityEntry, JournalEntry, MoodEntry, User
+    from mentalhealth_app.data.database import AsyncSessionLocal
+
+    # Only the seeded users: rows written by benchmark runs must not change the dataset's identity
+    seeded = select(User.id).where(User.username.startswith(prefix, autoescape=True))
+    async with AsyncSessionLocal() as db:
+        counts = {"users": await db.scalar(select(func.count()).select_from(seeded.subquery()))}
+        for name, model in (("mood", MoodEntry), ("activity", ActivityEntry), ("journal", JournalEntry)):
+            counts[name] = await db.scalar(
+                select(func.count()).select_from(model).where(model.user_id.in_(seeded))
+            )
+    return counts
+
+
+async def run(args):
+    from mentalhealth_app.business.app import app
+    from mentalhealth_app.data.database import async_engine
+    from mentalhealth_app.settings import settings
+
+    import httpx
+
+    from .scenarios import SCENARIOS, Context, login, register
+
+    selected = SCENARIOS
+    if args.only:
+        names = set(args.only.split(","))
+        unknown = names - {scenario.name for scenario in SCENARIOS}
+        if unknown:
+            raise SystemExit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+        selected = [scenario for scenario in SCENARIOS if scenario.name in names]
+
+    dataset = await _dataset(args.prefix)
+    if dataset["users"] < 1:
+        raise SystemExit(f"No '{args.prefix}' users in the database; run python -m benchmarks.seed first")
+
+    results = {}
+    try:
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+                readers = []
+                for index in range(min(args.users, dataset["users"])):
+                    username = f"{args.prefix}{index:06d}"
+                    readers.append((username, await login(client, username)))
+                ctx = Context(uuid.uuid4().hex[:8], readers)
+                ctx.writer = await register(client, ctx.unique("writer"))
+
+                for scenario in selected:
+                    requests = max(1, int(args.requests * scenario.weight))
+                    result = await measure(
+                        client, scenario, ctx, requests, args.concurrency, args.warmup,
+                        args.memory_requests if not args.no_memory else 0,
+                    )
+                    results[scenario.name] = result
+                    print(_row(scenario.name, result), flush=True)
+    finally:
+        await async_engine.dispose()
+
+    return {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": settings.database_url.split("://", 1)[0],
+            "dataset": dataset,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "readers": len(readers),
+            "max_rss_kib": _max_rss_kib(),
+        },
+        "results": results,
+    }
+
+
+def _max_rss_kib():
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // (1024 if sys.platform == "darwin" else 1)
+
+
+HEADER = f"{'scenario':<20} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9} {'peak KiB':>9} {'errors':>6}"
+
+
+def _row(name, result):
+    peak = f"{result['peak_kib']:>9.1f}" if result["peak_kib"] is not None else f"{'-':>9}"
+    return (
+        f"{name:<20} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} "
+        f"{result['throughput_rps']:>9.1f} {peak} {result['errors']:>6}"
+    )
+
+
+def compare(report, baseline, tolerance, min_delta_ms, min_delta_kib):
+    """Regressions of report against baseline, as human-readable strings."""
+    regressions = []
+    if baseline["meta"].get("dataset") != report["meta"]["dataset"]:
+        print(f"warning: dataset differs from the baseline's {baseline['meta'].get('dataset')}")
+    for name, result in report["results"].items():
+        if result["errors"]:
+            regressions.append(f"{name}: {result['errors']} unexpected responses {result['statuses']}")
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        for key in GATED_PERCENTILES:
+            limit = base[key] * (1 + tolerance)
+            if result[key] > limit and result[key] - base[key] > min_delta_ms:
+                regressions.append(f"{name}: {key} {result[key]:.2f} vs baseline {base[key]:.2f}")
+        if result["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {result['throughput_rps']:.1f} req/s vs baseline {base['throughput_rps']:.1f}"
+            )
+        if result["peak_kib"] is not None and base.get("peak_kib") is not None:
+            if result["peak_kib"] > base["peak_kib"] * (1 + tolerance) and result["peak_kib"] - base["peak_kib"] > min_delta_kib:
+                regressions.append(f"{name}: peak memory {result['peak_kib']:.0f} KiB vs baseline {base['peak_kib']:.0f}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the API in-process against the seeded dataset")
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--memory-requests", type=int, default=10, help="requests in the traced memory pass")
+    parser.add_argument("--no-memory", action="store_true", help="skip the memory pass")
+    parser.add_argument("--users", type=int, default=20, help="seeded users to spread reads over")
+    parser.add_argument("--prefix", default="bench", help="username prefix used by benchmarks.seed")
+    parser.add_argument("--only", help="comma-separated scenario names")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore latency changes smaller than this")
+    parser.add_argument("--min-delta-kib", type=float, default=64.0, help="ignore memory changes smaller than this")
+    parser.add_argument("--output", help="also write the report as JSON to this path")
+    parser.add_argument("--database-url", help="defaults to MENTALHEALTH_DATABASE_URL / the app's database")
+    args = parser.parse_args(argv)
+
+    use_database(args.database_url)
+    print(HEADER)
+    report = asyncio.run(run(args))
+    if report["meta"]["max_rss_kib"] is not None:
+        print(f"max RSS {report['meta']['max_rss_kib'] / 1024:.0f} MiB")
+    failed = [name for name, result in report["results"].items() if result["errors"]]
+    if failed:
+        print(f"Unexpected responses from: {', '.join(failed)}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 1 if failed else 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return 1 if failed else 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(report, baseline, args.tolerance, args.min_delta_ms, args.min_delta_kib)
+    if regressions:
+        print(f"\n{len(regressions)} REGRESSION(S) against {args.baseline}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"\nNo regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+# scenarios.py
+# One scenario per API endpoint. Reads are spread over the seeded users so
+# caches see a realistic mix; writes go to a per-run writer account so the
+# seeded histories - and with them the read numbers - stay the same from run
+# to run.
+#
+# Not covered: /events (an endless SSE stream; httpx's ASGI transport waits
+# for the whole body) and /admin/profiles (only there with profiling on).
+import itertools
+import json
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+import httpx
+
+from .seed import PASSWORD
+
+Call = Callable[[httpx.AsyncClient, "Context", int], Awaitable[httpx.Response]]
+
+
+@dataclass
+class Scenario:
+    name: str
+    call: Call
+    # Runs before timing, with the number of requests that will be made
+    prepare: Optional[Callable[[httpx.AsyncClient, "Context", int], Awaitable[None]]] = None
+    # Requests that depend on the previous one (e.g. password changes) run one at a time
+    serial: bool = False
+    # Share of --requests to run, for endpoints much slower than the rest
+    weight: float = 1.0
+    expected: tuple = (200,)
+
+
+class Context:
+    def __init__(self, run_id: str, readers: list):
+        self.run_id = run_id
+        self.readers = readers  # [(username, auth headers)]
+        self.writer = None  # auth headers of this run's writer account
+        self.state = {}
+        self._ids = itertools.count()
+
+    def reader(self, i):
+        return self.readers[i % len(self.readers)]
+
+    def unique(self, label):
+        return f"{self.run_id}-{label}-{next(self._ids)}"
+
+
+async def login(client, username, password=PASSWORD):
+    response = await client.post("/login", data={"username": username, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def register(client, username, password=PASSWORD):
+    response = await client.post("/register", data={"username": username, "password": password})
+    response.raise_for_status()
+    return await login(client, username, password)
+
+
+def _get(path, **params):
+    async def call(client, ctx, i):
+        username, headers = ctx.reader(i)
+        return await client.get(path.format(username=username), params=params, headers=headers)
+    return call
+
+
+async def _prepare_logout(client, ctx, n):
+    username, _ = ctx.reader(0)
+    ctx.state["logout_tokens"] = [await login(client, username) for _ in range(n)]
+
+
+async def _logout(client, ctx, i):
+    return await client.post("/logout", headers=ctx.state["logout_tokens"][i])
+
+
+async def _prepare_change_password(client, ctx, n):
+    username = ctx.unique("password")
+    ctx.state["password"] = [username, PASSWORD, await register(client, username)]
+
+
+async def _change_password(client, ctx, i):
+    username, password, headers = ctx.state["password"]
+    new_password = f"{PASSWORD}-{i}"
+    response = await client.post(
+        "/change_password", data={"old_password": password, "new_password": new_password}, headers=headers
+    )
+    if response.status_code == 200:
+        ctx.state["password"] = [username, new_password, {"Authorization": f"Bearer {response.json()['access_token']}"}]
+    return response
+
+
+def _batch_items(ctx, size):
+    items = []
+    for k in range(size):
+        key = ctx.unique("batch")
+        kind = ("mood", "activity", "journal")[k % 3]
+        if kind == "mood":
+            items.append({"type": "mood", "idempotency_key": key, "score": 1 + k % 10})
+        elif kind == "activity":
+            items.append({"type": "activity", "idempotency_key": key, "activity": "Walking", "duration": 30})
+        else:
+            items.append({"type": "journal", "idempotency_key": key, "entry": "Benchmark batch entry"})
+    return items
+
+
+async def _batch(client, ctx, i):
+    return await client.post("/batch", json=_batch_items(ctx, 30), headers=ctx.writer)
+
+
+async def _import(client, ctx, i):
+    lines = []
+    for item in _batch_items(ctx, 60):
+        item["client_key"] = item.pop("idempotency_key")
+        lines.append(json.dumps(item))
+    return await client.post(
+        "/import", params={"format": "ndjson"}, content="\n".join(lines).encode(), headers=ctx.writer
+    )
+
+
+async def _prepare_etags(client, ctx, n):
+    etags = []
+    for username, headers in ctx.readers:
+        response = await client.get("/mood_history", headers=headers)
+        etags.append(response.headers["etag"])
+    ctx.state["etags"] = etags
+
+
+async def _mood_history_not_modified(client, ctx, i):
+    _, headers = ctx.reader(i)
+    etag = ctx.state["etags"][i % len(ctx.readers)]
+    return await client.get("/mood_history", headers={**headers, "If-None-Match": etag})
+
+
+async def _prepare_cursors(client, ctx, n):
+    cursors = []
+    for username, headers in ctx.readers:
+        response = await client.get("/mood_history", params={"limit": 50}, headers=headers)
+        cursors.append(response.json()["next_cursor"])
+    ctx.state["cursors"] = cursors
+
+
+async def _mood_history_page2(client, ctx, i):
+    _, headers = ctx.reader(i)
+    cursor = ctx.state["cursors"][i % len(ctx.readers)]
+    return await client.get("/mood_history", params={"limit": 50, "cursor": cursor}, headers=headers)
+
+
+def _post_writer(path, data):
+    async def call(client, ctx, i):
+        return await client.post(path, data=data, headers=ctx.writer)
+    return call
+
+
+async def _register(client, ctx, i):
+    return await client.post("/register", data={"username": ctx.unique("register"), "password": PASSWORD})
+
+
+async def _login(client, ctx, i):
+    username, _ = ctx.reader(i)
+    return await client.post("/login", data={"username": username, "password": PASSWORD})
+
+
+SCENARIOS = [
+    Scenario("root", lambda client, ctx, i: client.get("/")),
+    Scenario("register", _register),
+    Scenario("login", _login),
+    Scenario("logout", _logout, prepare=_prepare_logout),
+    Scenario("change_password", _change_password, prepare=_prepare_change_password, serial=True),
+    Scenario("dashboard", _get("/dashboard")),
+    Scenario("mood_history", _get("/mood_history")),
+    Scenario("mood_history_page2", _mood_history_page2, prepare=_prepare_cursors),
+    Scenario("mood_history_304", _mood_history_not_modified, prepare=_prepare_etags, expected=(304,)),
+    Scenario("activity_history", _get("/activity_history")),
+    Scenario("journal_history", _get("/journal_history")),
+    Scenario("changes_full", _get("/changes", since="MDowOjA")),
+    Scenario("activity_totals", _get("/activity_totals", period="week", range="1y")),
+    Scenario("journal_search", _get("/journal_search", q="walk")),
+    Scenario("insights", _get("/insights/{username}")),
+    Scenario("trends_90d", _get("/insights/{username}/trends", range="90d")),
+    Scenario("trends_all", _get("/insights/{username}/trends", range="all")),
+    Scenario("mood_chart", _get("/mood_chart/{username}")),
+    Scenario("mood_chart_png", _get("/mood_chart/{username}", format="png"), weight=0.25),
+    Scenario("export_ndjson", _get("/export", format="ndjson"), weight=0.25),
+    Scenario("export_csv", _get("/export", format="csv"), weight=0.25),
+    Scenario("mood", _post_writer("/mood", {"score": 7, "notes": "benchmark"})),
+    Scenario("activity", _post_writer("/activity", {"activity": "Walking", "duration": 30})),
+    Scenario("journal", _post_writer("/journal", {"entry": "Benchmark journal entry about a walk"})),
+    Scenario("batch", _batch, weight=0.5),
+    Scenario("import", _import, weight=0.5),
+    Scenario("metrics", lambda client, ctx, i: client.get("/metrics")),
+]
@@ -0,0 +1,218 @@
+# seed.py
+# Generates users with realistic mood, activity and journal histories:
+# each user has their own baseline mood, slow mood swings over weeks, better
+# weekends, a few favourite activities that lift same-day mood, skipped days
+# and free-text journal entries. Output is deterministic for a given --seed.
+#
+# Rows go in through multi-row INSERTs in large transactions and the mood
+# rollups are rebuilt once at the end, so millions of rows take minutes:
+#
+#   python -m benchmarks.seed --users 1000 --days 730
+#   python -m benchmarks.seed --users 50 --reset --database-url sqlite:////tmp/bench.db
+import argparse
+import math
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from benchmarks import use_database
+
+USERNAME_PREFIX = "bench"
+PASSWORD = "bench-password"
+INSERT_CHUNK = 20_000
+
+# name, typical minutes, same-day mood effect
+ACTIVITIES = (
+    ("Running", 35, 1.2),
+    ("Walking", 40, 0.6),
+    ("Yoga", 30, 0.8),
+    ("Meditation", 15, 0.7),
+    ("Cycling", 50, 1.0),
+    ("Swimming", 40, 0.9),
+    ("Reading", 45, 0.4),
+    ("Socializing", 120, 0.9),
+    ("Gaming", 90, -0.2),
+    ("Cleaning", 30, 0.1),
+    ("Cooking", 45, 0.3),
+    ("Overtime work", 120, -0.8),
+)
+
+_OPENERS = (
+    "Today", "This morning", "Tonight", "After work", "Over lunch", "This afternoon",
+)
+_EVENTS = (
+    "I went for a long walk in the park", "work was stressful and deadlines piled up",
+    "I called my sister and we talked for an hour", "I slept badly and felt tired all day",
+    "I finished the book I have been reading", "the weather was grey and rainy",
+    "I had a good therapy session", "I cooked dinner with friends",
+    "my meeting with the manager went well", "I argued with my partner about chores",
+    "I spent too long scrolling on my phone", "I tried a new yoga class",
+    "the commute took forever", "I got outside into the sunshine",
+)
+_FEELINGS = (
+    "I feel calm and grateful.", "Anxiety crept in again in the evening.",
+    "Energy was low but I kept going.", "I feel proud of myself.",
+    "Still a bit overwhelmed.", "Overall a good day.", "I need more rest this week.",
+    "Feeling hopeful about tomorrow.", "My mood lifted after exercising.",
+)
+_NOTES = ("tired", "anxious", "calm", "happy", "stressed", "ok", "energetic", "sad", "focused")
+
+
+def _count(rng, rate):
+    """Entries on one day: rate on average, as whole numbers."""
+    whole = int(rate)
+    return whole + (rng.random() < rate - whole)
+
+
+def _clamp(score):
+    return max(1, min(10, round(score)))
+
+
+def user_history(rng, user_id, days, end, moods_per_day, activities_per_day, journals_per_day, skip_rate):
+    """(moods, activities, journals) row dicts for one user's last `days` days."""
+    from mentalhealth_app.business.activities import normalize_activity
+
+    baseline = rng.gauss(6.0, 1.2)
+    swing = rng.uniform(0.5, 1.8)
+    swing_days = rng.uniform(20, 90)
+    phase = rng.uniform(0, 2 * math.pi)
+    favourites = rng.sample(ACTIVITIES, k=rng.randint(2, 5))
+
+    moods, activities, journals = [], [], []
+    start = (end - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        if rng.random() < skip_rate:
+            continue
+        level = baseline + swing * math.sin(2 * math.pi * offset / swing_days + phase)
+        if day.weekday() >= 5:
+            level += 0.5
+
+        for _ in range(_count(rng, activities_per_day)):
+            name, minutes, effect = rng.choice(favourites)
+            level += effect * 0.5
+            activities.append({
+                "user_id": user_id,
+                "activity": name,
+                "activity_key": normalize_activity(name),
+                "duration": max(5, int(rng.gauss(minutes, minutes / 3))),
+                "created_at": day + timedelta(seconds=rng.randint(6 * 3600, 22 * 3600)),
+            })
+        for _ in range(_count(rng, moods_per_day)):
+            moods.append({
+                "user_id": user_id,
+                "score": _clamp(rng.gauss(level, 1.0)),
+                "notes": rng.choice(_NOTES) if rng.random() < 0.3 else None,
+                "created_at": day + timedelta(seconds=rng.randint(7 * 3600, 23 * 3600)),
+            })
+        for _ in range(_count(rng, journals_per_day)):
+            journals.append({
+                "user_id": user_id,
+                "entry": f"{rng.choice(_OPENERS)} {rng.choice(_EVENTS)}. {rng.choice(_FEELINGS)}",
+                "created_at": day + timedelta(seconds=rng.randint(19 * 3600, 24 * 3600 - 1)),
+            })
+    return moods, activities, journals
+
+
+def _reset(connection, prefix):
+    from sqlalchemy import delete, select
+
+    from mentalhealth_app.business.models import ActivityEntry, JournalEntry, MoodEntry, User
+
+    user_ids = select(User.id).where(User.username.startswith(prefix, autoescape=True))
+    for model in (MoodEntry, ActivityEntry, JournalEntry):
+        connection.execute(delete(model).where(model.user_id.in_(user_ids)))
+    return connection.execute(delete(User).where(User.username.startswith(prefix, autoescape=True))).rowcount
+
+
+def seed(users, days, moods_per_day=2.0, activities_per_day=1.2, journals_per_day=0.5,
+         skip_rate=0.08, seed_value=42, prefix=USERNAME_PREFIX, reset=False, out=sys.stdout):
+    """Create `users` users named <prefix>000000... with `days` days of history each."""
+    from sqlalchemy import func, insert, select
+
+    # Importing the app creates the tables and applies migrations
+    import mentalhealth_app.business.app  # noqa: F401
+    from mentalhealth_app.business import passwords, rollups
+    from mentalhealth_app.business.models import ActivityEntry, JournalEntry, MoodEntry, User
+    from mentalhealth_app.data.database import SessionLocal, engine
+
+    rng = random.Random(seed_value)
+    end = datetime.utcnow()
+    # Every benchmark user shares one password, so hash it once
+    hashed_password = passwords.hash_password(PASSWORD)
+
+    with engine.begin() as connection:
+        if reset:
+            print(f"Removed {_reset(connection, prefix)} existing '{prefix}' users", file=out)
+        existing = connection.scalar(
+            select(func.count()).select_from(User).where(User.username.startswith(prefix, autoescape=True))
+        )
+        if existing:
+            raise SystemExit(f"{existing} '{prefix}' users already exist; pass --reset to replace them")
+
+    started = time.perf_counter()
+    totals = {"mood": 0, "activity": 0, "journal": 0}
+    pending = {"mood": [], "activity": [], "journal": []}
+    models = {"mood": MoodEntry, "activity": ActivityEntry, "journal": JournalEntry}
+
+    def flush(connection, force=False):
+        for kind, rows in pending.items():
+            if rows and (force or len(rows) >= INSERT_CHUNK):
+                connection.execute(insert(models[kind]), rows)
+                totals[kind] += len(rows)
+                rows.clear()
+
+    with engine.begin() as connection:
+        for index in range(users):
+            user_id = connection.execute(insert(User).values(
+                username=f"{prefix}{index:06d}",
+                email=f"{prefix}{index:06d}@example.com",
+                hashed_password=hashed_password,
+                created_at=end - timedelta(days=days),
+            )).inserted_primary_key[0]
+            moods, activities, journals = user_history(
+                rng, user_id, days, end, moods_per_day, activities_per_day, journals_per_day, skip_rate
+            )
+            pending["mood"].extend(moods)
+            pending["activity"].extend(activities)
+            pending["journal"].extend(journals)
+            flush(connection)
+            if (index + 1) % 100 == 0 or index + 1 == users:
+                rows = sum(totals.values())
+                print(f"  {index + 1}/{users} users, {rows:,} rows "
+                      f"({rows / (time.perf_counter() - started):,.0f} rows/s)", file=out)
+        flush(connection, force=True)
+
+    with SessionLocal() as session:
+        rollups.backfill(session)
+
+    elapsed = time.perf_counter() - started
+    print(f"Seeded {users} users: {totals['mood']:,} moods, {totals['activity']:,} activities, "
+          f"{totals['journal']:,} journal entries in {elapsed:.1f}s", file=out)
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic users and entry histories")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--days", type=int, default=365, help="history length per user")
+    parser.add_argument("--moods-per-day", type=float, default=2.0)
+    parser.add_argument("--activities-per-day", type=float, default=1.2)
+    parser.add_argument("--journals-per-day", type=float, default=0.5)
+    parser.add_argument("--skip-rate", type=float, default=0.08, help="share of days without any entries")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--prefix", default=USERNAME_PREFIX, help="username prefix")
+    parser.add_argument("--reset", action="store_true", help="delete existing users with the prefix first")
+    parser.add_argument("--database-url", help="defaults to MENTALHEALTH_DATABASE_URL / the app's database")
+    args = parser.parse_args(argv)
+
+    use_database(args.database_url)
+    seed(
+        args.users, args.days, args.moods_per_day, args.activities_per_day, args.journals_per_day,
+        args.skip_rate, args.seed, args.prefix, args.reset,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# activities.py
+# Activity totals per day, week or month, grouped in SQL. Activity names are
+# free text, so every entry also stores a normalized activity_key ("Running ",
+# "running" -> "running"); grouping and filtering use the key and the
+# (user_id, activity_key, created_at, duration) covering index.
+from datetime import datetime, timedelta
+
+from sqlalchemy import Date, cast, func, select
+
+from .models import ActivityEntry
+
+PERIODS = ("day", "week", "month")
+
+
+def normalize_activity(name: str) -> str:
+    return " ".join((name or "").split()).lower()
+
+
+def bucket_expression(period: str, dialect_name: str):
+    """SQL expression for the first day of the entry's period, as a date."""
+    column = ActivityEntry.created_at
+    if dialect_name == "postgresql":
+        # date_trunc weeks start on Monday (ISO)
+        return cast(func.date_trunc(period, column), Date)
+    if period == "week":
+        # Forward to Sunday (or stay on it), then back to that week's Monday
+        return func.date(column, "weekday 0", "-6 days")
+    if period == "month":
+        return func.date(column, "start of month")
+    return func.date(column)
+
+
+def _minutes(total, count):
+    return round(total / count, 1) if count else None
+
+
+def totals_query(dialect_name: str, user_id: int, period: str, start: datetime = None, activity: str = None):
+    bucket = bucket_expression(period, dialect_name).label("bucket")
+    query = (
+        select(
+            bucket,
+            ActivityEntry.activity_key,
+            func.count().label("entries"),
+            func.coalesce(func.sum(ActivityEntry.duration), 0).label("total_minutes"),
+        )
+        .where(ActivityEntry.user_id == user_id)
+        .group_by(bucket, ActivityEntry.activity_key)
+        .order_by(bucket.desc(), ActivityEntry.activity_key)
+    )
+    if activity:
+        query = query.where(ActivityEntry.activity_key == normalize_activity(activity))
+    if start:
+        query = query.where(ActivityEntry.created_at >= start)
+    return query
+
+
+async def activity_totals(db, user_id: int, period: str = "week", days: int = None, activity: str = None):
+    """Total and average minutes per activity per period, newest period first.
+
+    `days` limits the range to the last N days (None for all history) and
+    `activity` to a single activity name.
+    """
+    start = None
+    if days:
+        start = (datetime.utcnow() - timedelta(days=days - 1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    rows = (await db.execute(totals_query(db.bind.dialect.name, user_id, period, start, activity))).all()
+
+    # One row per (period, activity); the per-period and overall sums are
+    # small enough to fold here instead of issuing more queries
+    buckets, totals = {}, {}
+    for row in rows:
+        day = str(row.bucket)
+        group = buckets.setdefault(day, {"period_start": day, "entries": 0, "total_minutes": 0, "activities": []})
+        group["activities"].append({
+            "activity": row.activity_key,
+            "entries": row.entries,
+            "total_minutes": row.total_minutes,
+            "average_minutes": _minutes(row.total_minutes, row.entries),
+        })
+        group["entries"] += row.entries
+        group["total_minutes"] += row.total_minutes
+        overall = totals.setdefault(row.activity_key, {"activity": row.activity_key, "entries": 0, "total_minutes": 0})
+        overall["entries"] += row.entries
+        overall["total_minutes"] += row.total_minutes
+
+    for overall in totals.values():
+        overall["average_minutes"] = _minutes(overall["total_minutes"], overall["entries"])
+    return {
+        "period": period,
+        "start": start.date().isoformat() if start else None,
+        "periods": list(buckets.values()),
+        "totals": sorted(totals.values(), key=lambda item: item["total_minutes"], reverse=True),
+    }
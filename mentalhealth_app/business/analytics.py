@@ -0,0 +1,221 @@
+# analytics.py
+# Mood trend analytics. Each query selects only the columns it needs, the
+# rows go straight into NumPy arrays, and every statistic below is an array
+# operation over days - no per-entry Python loops - so multi-year histories
+# take milliseconds.
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import Float, extract, func, select, type_coerce
+
+from .models import ActivityEntry, MoodEntry
+
+RANGES = {"7d": 7, "30d": 30, "90d": 90, "1y": 365, "all": None}
+ROLLING_WINDOWS = (7, 30)
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+# A correlation over fewer days than this is noise
+MIN_CORRELATION_DAYS = 5
+
+
+def _weekday(days):
+    # 1970-01-01 (day 0) was a Thursday; Monday is 0
+    return (days.astype(np.int64) + 3) % 7
+
+
+def _round(values, digits=2):
+    return np.where(np.isnan(values), None, np.round(values, digits)).tolist()
+
+
+def _mean(values):
+    return round(float(values.mean()), 2) if len(values) else None
+
+
+def _group(keys, values):
+    """(unique keys, counts, sums) of values grouped by sorted keys."""
+    unique, starts, counts = np.unique(keys, return_index=True, return_counts=True)
+    return unique, counts, np.add.reduceat(values, starts) if len(values) else values
+
+
+def _pearson(x, y):
+    if len(x) < MIN_CORRELATION_DAYS or np.std(x) == 0 or np.std(y) == 0:
+        return None
+    return round(float(np.corrcoef(x, y)[0, 1]), 3)
+
+
+def daily_series(days, scores):
+    """Per-day averages plus trailing calendar-day rolling averages."""
+    unique, counts, sums = _group(days, scores)
+    # Dense calendar so windows count days, not entries; empty days add nothing
+    offsets = (unique - unique[0]).astype(np.int64)
+    span = offsets[-1] + 1
+    dense_sum = np.zeros(span)
+    dense_count = np.zeros(span)
+    dense_sum[offsets] = sums
+    dense_count[offsets] = counts
+    cum_sum = np.concatenate(([0.0], np.cumsum(dense_sum)))
+    cum_count = np.concatenate(([0.0], np.cumsum(dense_count)))
+
+    rolling = {}
+    for window in ROLLING_WINDOWS:
+        lower = np.maximum(offsets + 1 - window, 0)
+        window_sum = cum_sum[offsets + 1] - cum_sum[lower]
+        window_count = cum_count[offsets + 1] - cum_count[lower]
+        rolling[window] = window_sum / window_count
+    return unique, counts, sums / counts, rolling
+
+
+def streaks(unique_days, today):
+    """(current, longest) runs of consecutive days with at least one entry."""
+    if not len(unique_days):
+        return 0, 0
+    breaks = np.flatnonzero(np.diff(unique_days.astype(np.int64)) != 1)
+    starts = np.concatenate(([0], breaks + 1))
+    ends = np.concatenate((breaks, [len(unique_days) - 1]))
+    lengths = ends - starts + 1
+    # A streak is still current if the last entry was today or yesterday
+    last_gap = (np.datetime64(today, "D") - unique_days[-1]).astype(np.int64)
+    current = int(lengths[-1]) if last_gap <= 1 else 0
+    return current, int(lengths.max())
+
+
+def activity_correlations(mood_days, mood_means, activity_days, activity_names, durations):
+    """How each activity (by day and minutes) relates to same-day average mood."""
+    results = []
+    if not len(activity_days):
+        return results, None
+
+    names, codes = np.unique(activity_names, return_inverse=True)
+    # Minutes per (mood day, activity) - days without the activity stay 0
+    positions = np.searchsorted(mood_days, activity_days)
+    positions = np.minimum(positions, len(mood_days) - 1)
+    on_mood_day = mood_days[positions] == activity_days
+    minutes = np.zeros((len(mood_days), len(names)))
+    np.add.at(minutes, (positions[on_mood_day], codes[on_mood_day]), durations[on_mood_day])
+
+    total_days = np.bincount(codes, minlength=len(names))
+    total_minutes = np.bincount(codes, weights=durations, minlength=len(names))
+    for index, name in enumerate(names):
+        did = minutes[:, index] > 0
+        results.append({
+            "activity": str(name),
+            "entries": int(total_days[index]),
+            "total_minutes": int(total_minutes[index]),
+            "mood_days_with": int(did.sum()),
+            "mood_with": _mean(mood_means[did]),
+            "mood_without": _mean(mood_means[~did]),
+            "minutes_correlation": _pearson(minutes[:, index], mood_means),
+        })
+    results.sort(key=lambda item: item["entries"], reverse=True)
+    return results, _pearson(minutes.sum(axis=1), mood_means)
+
+
+def compute(mood_times, scores, activity_times, activity_names, durations, start, now):
+    """Analytics over NumPy arrays; rows before `start` only warm up the rolling windows."""
+    days = mood_times.astype("datetime64[D]")
+    start_day = np.datetime64(start, "D") if start else days[0]
+    unique, counts, means, rolling = daily_series(days, scores)
+    shown = unique >= start_day
+
+    in_range = days >= start_day
+    days, scores = days[in_range], scores[in_range]
+    day_means = means[shown]
+    if not len(scores):
+        return None
+
+    weeks = days - _weekday(days).astype("timedelta64[D]")
+    week_keys, week_counts, week_sums = _group(weeks, scores)
+    month_keys, month_counts, month_sums = _group(days.astype("datetime64[M]"), scores)
+    weekday_counts = np.bincount(_weekday(days), minlength=7)
+    weekday_sums = np.bincount(_weekday(days), weights=scores, minlength=7)
+
+    activity_days = activity_times.astype("datetime64[D]")
+    keep = activity_days >= start_day
+    activities, minutes_correlation = activity_correlations(
+        unique[shown], day_means, activity_days[keep], activity_names[keep], durations[keep]
+    )
+    current, longest = streaks(unique[shown], now)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        weekday_means = weekday_sums / weekday_counts
+    return {
+        "start": str(start_day),
+        "end": str(np.datetime64(now, "D")),
+        "entry_count": int(len(scores)),
+        "average_mood": _mean(scores),
+        "std_dev": round(float(scores.std()), 2),
+        "daily": [
+            {"day": str(day), "entries": int(count), "average_mood": mean, "avg_7d": avg7, "avg_30d": avg30}
+            for day, count, mean, avg7, avg30 in zip(
+                unique[shown], counts[shown], _round(day_means),
+                _round(rolling[7][shown]), _round(rolling[30][shown]),
+            )
+        ],
+        "weekly": [
+            {"week": str(week), "entries": int(count), "average_mood": mean}
+            for week, count, mean in zip(week_keys, week_counts, _round(week_sums / week_counts))
+        ],
+        "monthly": [
+            {"month": str(month), "entries": int(count), "average_mood": mean}
+            for month, count, mean in zip(month_keys, month_counts, _round(month_sums / month_counts))
+        ],
+        "day_of_week": [
+            {"day": name, "entries": int(count), "average_mood": mean}
+            for name, count, mean in zip(WEEKDAYS, weekday_counts, _round(weekday_means))
+        ],
+        "streaks": {"current_days": current, "longest_days": longest},
+        "activities": activities,
+        "activity_minutes_correlation": minutes_correlation,
+    }
+
+
+def _epoch_seconds(column, dialect_name):
+    # Timestamps come back as plain floats: building datetime objects per row
+    # and converting them costs more than all of the analytics
+    if dialect_name == "postgresql":
+        return type_coerce(extract("epoch", column), Float)
+    return (func.julianday(column) - 2440587.5) * 86400.0
+
+
+def _to_datetime64(seconds):
+    return np.round(np.asarray(seconds, dtype=np.float64) * 1e6).astype(np.int64).view("datetime64[us]")
+
+
+async def mood_trends(db, user_id: int, range_name: str = "90d", now: datetime = None):
+    """Trend analytics for one user over a named range, or None without entries."""
+    now = now or datetime.utcnow()
+    days = RANGES[range_name]
+    start = (now - timedelta(days=days - 1)).replace(hour=0, minute=0, second=0, microsecond=0) if days else None
+    # Load enough history before the range for its first rolling averages
+    load_from = start - timedelta(days=max(ROLLING_WINDOWS) - 1) if start else None
+
+    dialect_name = db.bind.dialect.name
+    mood_query = (
+        select(_epoch_seconds(MoodEntry.created_at, dialect_name), MoodEntry.score)
+        .where(MoodEntry.user_id == user_id)
+    )
+    activity_query = (
+        # activity_key, so activities group here exactly as in /activity_totals
+        select(_epoch_seconds(ActivityEntry.created_at, dialect_name), ActivityEntry.activity_key, ActivityEntry.duration)
+        .where(ActivityEntry.user_id == user_id)
+    )
+    if load_from:
+        mood_query = mood_query.where(MoodEntry.created_at >= load_from)
+        activity_query = activity_query.where(ActivityEntry.created_at >= start)
+
+    moods = (await db.execute(mood_query.order_by(MoodEntry.created_at))).all()
+    if not moods:
+        return None
+    activities = (await db.execute(activity_query)).all()
+
+    mood_times, scores = zip(*moods)
+    activity_times, names, durations = zip(*activities) if activities else ((), (), ())
+    return compute(
+        _to_datetime64(mood_times),
+        np.array(scores, dtype=np.float64),
+        _to_datetime64(activity_times),
+        np.array(names, dtype=np.str_),
+        # A missing duration (NULL -> NaN) counts as zero minutes
+        np.nan_to_num(np.array(durations, dtype=np.float64)),
+        start,
+        now,
+    )
@@ -1,112 +1,270 @@
-from fastapi import FastAPI, Depends, HTTPException, Form, status
-from fastapi.responses import JSONResponse
-from fastapi.security import HTTPBasic
-from sqlalchemy.orm import Session
+from fastapi import FastAPI, Body, Depends, HTTPException, Form, Header, Query, Request, status
+from fastapi.responses import FileResponse, ORJSONResponse, PlainTextResponse, Response, StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
-import matplotlib.pyplot as plt
-import io
+import asyncio
 import base64
-from typing import Optional
+
+import orjson
+from typing import List, Literal, Optional
 
 # Correct imports from your modules
-from mentalhealth_app.data.database import engine, get_db, Base  # Add Base here
+from mentalhealth_app.data.database import async_engine, engine, get_async_db, Base  # Add Base here
+from mentalhealth_app.data.migrations import migrate
+from mentalhealth_app.settings import settings
+from . import (
+    activities, analytics, changes, charts, export, ingest, metrics, passwords, profiling, pubsub, rollups, search,
+)
+from .compression import CompressionMiddleware
+from .metrics import MetricsMiddleware
+from .profiling import ProfilingMiddleware, require_admin
+from .writebuffer import WriteBuffer
 from .models import ActivityEntry, JournalEntry, User, MoodEntry
+from .pagination import MAX_PAGE_SIZE, fetch_page
+from .schemas import MAX_BATCH_SIZE, BatchItem
+from .serializers import activity_to_dict, entry_columns, journal_to_dict, mood_to_dict
+from .sessions import (
+    CachedUser, SessionToken, encode_token, get_current_token, get_current_user,
+    invalidate_user, issue_token, revoke_token, user_cache,
+)
 
 # Create tables - NOW WITH ACCESS TO Base
+# (sync engine, runs once at import time before the event loop serves requests)
 Base.metadata.create_all(bind=engine)
+# Bring existing databases up to date (indexes, backfills) - create_all never alters tables
+migrate(engine)
+
+# orjson encodes datetimes natively; hot endpoints return ORJSONResponse
+# themselves, which also skips FastAPI's jsonable_encoder pass
+app = FastAPI(default_response_class=ORJSONResponse)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.compression_minimum_size,
+    gzip_level=settings.compression_gzip_level,
+    brotli_quality=settings.compression_brotli_quality,
+)
+if settings.metrics_enabled:
+    # Added last so it is outermost and its timings include compression
+    app.add_middleware(MetricsMiddleware, slow_request_ms=settings.slow_request_ms)
+    metrics.instrument_engine(async_engine.sync_engine)
+    metrics.registry.register_cache("charts", charts.chart_cache)
+    metrics.registry.register_cache("users", user_cache)
+if settings.profiling_enabled:
+    app.add_middleware(
+        ProfilingMiddleware,
+        sample_rate=settings.profiling_sample_rate,
+        directory=settings.profiling_dir,
+        keep=settings.profiling_keep,
+    )
+
+EVENTS_HEARTBEAT_SECONDS = 15
+
+@app.on_event("shutdown")
+def shutdown_chart_pool():
+    charts.shutdown_pool()
+
+@app.on_event("shutdown")
+def shutdown_password_pool():
+    passwords.shutdown_pool()
+
+async def publish_flushed(by_user: dict):
+    for user_id, created in by_user.items():
+        await publish_entries(user_id, created)
 
-app = FastAPI()
-security = HTTPBasic()
+async def publish_failed(by_user: dict):
+    # Relaxed mode answered these requests before the write failed; /events is
+    # the only way left to tell the client
+    for user_id, failures in by_user.items():
+        await pubsub.broker.publish(user_id, "write_failed", [
+            {"type": kind, **values, "error": "Entry could not be saved"} for kind, values, _ in failures
+        ])
 
-# Password hashing (in production use bcrypt)
-def get_password_hash(password: str):
-    # In production, use: bcrypt.hashpw(password.encode(), bcrypt.gensalt())
-    return f"hashed_{password}"  # Simple hash for development
+# Optional group commit for the single-entry endpoints (see writebuffer.py)
+write_buffer = WriteBuffer(
+    max_batch=settings.write_buffer_max_batch,
+    max_delay=settings.write_buffer_max_delay_ms / 1000,
+    durable=settings.write_buffer_mode == "durable",
+    on_flush=publish_flushed,
+    on_failed=publish_failed,
+) if settings.write_buffer_enabled else None
 
+@app.on_event("shutdown")
+async def flush_write_buffer():
+    if write_buffer is not None:
+        await write_buffer.close()
+
+# Registered after flush_write_buffer, which still needs the database. Each
+# pooled aiosqlite connection keeps a non-daemon thread running, so without
+# this the process never exits after shutdown
+@app.on_event("shutdown")
+async def dispose_engines():
+    await async_engine.dispose()
+    engine.dispose()
 
 # Authentication
-def authenticate_user(db: Session, username: str, password: str):
-    user = db.query(User).filter(User.username == username).first()
-    if not user or user.hashed_password != get_password_hash(password):
+async def check_password(db: AsyncSession, user: User, password: str) -> bool:
+    matches, needs_rehash = await passwords.verify_in_pool(password, user.hashed_password)
+    if matches and needs_rehash:
+        # Legacy or outdated hash: replace it while the plain password is at hand
+        user.hashed_password = await passwords.hash_in_pool(password)
+        await db.commit()
+    return matches
+
+
+async def authenticate_user(db: AsyncSession, username: str, password: str):
+    user = await db.scalar(select(User).where(User.username == username))
+    if not user or not await check_password(db, user, password):
         return False
     return user
 
+
+async def publish_entries(user_id: int, created: dict):
+    # Called after commit, so subscribers never see an entry that was rolled back
+    data = {name: [to_dict(row) for row in created[name]] for name, _, to_dict in changes.FEEDS if created.get(name)}
+    if data:
+        await pubsub.broker.publish(user_id, "entries", data)
+
+
+def require_same_user(user: CachedUser, username: str):
+    if user.username != username:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed for this user")
+
+async def history_page(db, model, to_dict, user_id, limit, cursor, if_none_match):
+    # The ETag only needs max(id), so unchanged pages cost one index lookup and no serialization
+    etag = await changes.history_etag(db, model, user_id, limit, cursor)
+    if if_none_match == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    
+    entries, next_cursor = await fetch_page(db, model, user_id, limit, cursor, entry_columns(model))
+    return ORJSONResponse(
+        {"items": [to_dict(entry) for entry in entries], "next_cursor": next_cursor},
+        headers={"ETag": etag}
+    )
+
 # Endpoints
+@app.get("/mood_history")
 @app.post("/mood_history")
 async def mood_history(
-    username: str = Form(...),
-    password: str = Form(...),
-    db: Session = Depends(get_db)
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    user: CachedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = authenticate_user(db, username, password)
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
-    entries = db.query(MoodEntry).filter(MoodEntry.user_id == user.id).order_by(MoodEntry.created_at.desc()).limit(10).all()
-    return [
-        {
-            "score": entry.score,
-            "notes": entry.notes,
-            "created_at": entry.created_at.isoformat()
-        }
-        for entry in entries
-    ]
+    return await history_page(db, MoodEntry, mood_to_dict, user.id, limit, cursor, if_none_match)
 
+@app.get("/activity_history")
 @app.post("/activity_history")
 async def activity_history(
-    username: str = Form(...),
-    password: str = Form(...),
-    db: Session = Depends(get_db)
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    user: CachedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = authenticate_user(db, username, password)
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
-    
     # Strictly filter by user_id and verify ownership
-    entries = db.query(ActivityEntry).filter(
-        ActivityEntry.user_id == user.id
-    ).order_by(
-        ActivityEntry.created_at.desc()
-    ).limit(20).all()
-    
-    if not entries:
-        return []
-        
-    return [
-        {
-            "activity": entry.activity,
-            "duration": entry.duration,
-            "created_at": entry.created_at.isoformat()
-        }
-        for entry in entries
-    ]
+    return await history_page(db, ActivityEntry, activity_to_dict, user.id, limit, cursor, if_none_match)
 
+@app.get("/journal_history")
 @app.post("/journal_history")
 async def journal_history(
-    username: str = Form(...),
-    password: str = Form(...),
-    db: Session = Depends(get_db)
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    user: CachedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = authenticate_user(db, username, password)
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
-    
     # Strictly filter by user_id and verify ownership
-    entries = db.query(JournalEntry).filter(
-        JournalEntry.user_id == user.id
-    ).order_by(
-        JournalEntry.created_at.desc()
-    ).limit(20).all()
+    return await history_page(db, JournalEntry, journal_to_dict, user.id, limit, cursor, if_none_match)
+
+@app.get("/changes")
+async def get_changes(
+    since: str,
+    limit: int = Query(changes.MAX_CHANGES, ge=1, le=changes.MAX_CHANGES),
+    user: CachedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Entries created after the client's watermark; start from /dashboard's changes_cursor
+    return ORJSONResponse(await changes.changes_since(db, user.id, since, limit))
+
+@app.get("/activity_totals")
+async def activity_totals(
+    period: Literal["day", "week", "month"] = "week",
+    range: Literal["7d", "30d", "90d", "1y", "all"] = "90d",
+    activity: Optional[str] = Query(None, max_length=200),
+    user: CachedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Grouped in one SQL query over the activity-key index; only the sums leave the database
+    totals = await activities.activity_totals(db, user.id, period, analytics.RANGES[range], activity)
+    return ORJSONResponse({"range": range, **totals})
+
+@app.get("/journal_search")
+async def journal_search(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    user: CachedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Ranked, index-backed search over the caller's journal entries
+    rows, next_cursor = await search.search_journal(db, user.id, q, limit, cursor)
+    return ORJSONResponse({
+        "items": [row._asdict() for row in rows],
+        "next_cursor": next_cursor
+    })
+
+@app.get("/dashboard")
+@app.post("/dashboard")
+async def dashboard(
+    user: CachedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Everything the client shows after login, in one round trip and one session.
+    # The queries are independent but an AsyncSession runs one at a time; each is
+    # a short index range scan, so running them back to back is cheap.
+    moods, moods_cursor = await fetch_page(db, MoodEntry, user.id, 10, columns=entry_columns(MoodEntry))
+    activities, activities_cursor = await fetch_page(
+        db, ActivityEntry, user.id, 20, columns=entry_columns(ActivityEntry)
+    )
+    journals, journals_cursor = await fetch_page(db, JournalEntry, user.id, 20, columns=entry_columns(JournalEntry))
+    insights = await rollups.mood_summary(db, user.id)
+    changes_cursor = await changes.current_cursor(db, user.id)
     
-    if not entries:
-        return []
-        
-    return [
-        {
-            "entry": entry.entry,
-            "created_at": entry.created_at.isoformat()
-        }
-        for entry in entries
-    ]
+    return ORJSONResponse({
+        "username": user.username,
+        "changes_cursor": changes_cursor,
+        "mood": {"items": [mood_to_dict(e) for e in moods], "next_cursor": moods_cursor},
+        "activity": {"items": [activity_to_dict(e) for e in activities], "next_cursor": activities_cursor},
+        "journal": {"items": [journal_to_dict(e) for e in journals], "next_cursor": journals_cursor},
+        "insights": insights
+    })
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/admin/profiles", include_in_schema=False, dependencies=[Depends(require_admin)])
+async def list_profiles():
+    return {"profiles": await asyncio.to_thread(profiling.list_profiles)}
+
+@app.get("/admin/profiles/{profile_id}", include_in_schema=False, dependencies=[Depends(require_admin)])
+async def get_profile(
+    profile_id: str,
+    format: Literal["summary", "raw"] = "summary",
+    sort: Literal["cumulative", "tottime", "calls"] = "cumulative",
+    top: int = Query(30, ge=1, le=500),
+):
+    path = profiling.profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "raw":
+        # Load with pstats, or view with e.g. snakeviz
+        return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
+    return PlainTextResponse(await asyncio.to_thread(profiling.summarize, path, sort, top))
 
 @app.get("/")
 async def root():
@@ -114,8 +272,19 @@ async def root():
         "message": "Mental Health Tracker API",
         "endpoints": {
             "register": "POST /register",
+            "login": "POST /login",
+            "logout": "POST /logout",
+            "dashboard": "GET /dashboard",
+            "changes": "GET /changes?since=",
             "log_mood": "POST /mood",
+            "log_batch": "POST /batch",
+            "events": "GET /events",
+            "export": "GET /export?format=ndjson|csv",
+            "import": "POST /import?format=ndjson|csv",
+            "journal_search": "GET /journal_search?q=",
+            "activity_totals": "GET /activity_totals?period=day|week|month",
             "get_insights": "GET /insights/{username}",
+            "mood_trends": "GET /insights/{username}/trends?range=7d|30d|90d|1y|all",
             "mood_chart": "GET /mood_chart/{username}"
         }
     }
@@ -125,10 +294,10 @@ async def register(
     username: str = Form(...),
     password: str = Form(...),
     email: Optional[str] = Form(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Check for existing username
-    existing_user = db.query(User).filter(User.username == username).first()
+    existing_user = await db.scalar(select(User).where(User.username == username))
     if existing_user:
         raise HTTPException(
             status_code=400,
@@ -137,7 +306,7 @@ async def register(
     
     # Check for existing email if provided
     if email:
-        existing_email = db.query(User).filter(User.email == email).first()
+        existing_email = await db.scalar(select(User).where(User.email == email))
         if existing_email:
             raise HTTPException(
                 status_code=400,
@@ -147,12 +316,12 @@ async def register(
     # Create new user
     db_user = User(
         username=username,
-        hashed_password=get_password_hash(password),
+        hashed_password=await passwords.hash_in_pool(password),
         email=email
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     return {"status": "success", "user_id": db_user.id}
 
@@ -160,174 +329,289 @@ async def register(
 async def login(
     username: str = Form(...),
     password: str = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = db.query(User).filter(User.username == username).first()
+    user = await db.scalar(select(User).where(User.username == username))
     if not user:
         raise HTTPException(status_code=401, detail="Invalid username")
     
-    # In production, use: bcrypt.checkpw(password.encode(), user.hashed_password.encode())
-    if user.hashed_password != get_password_hash(password):
+    if not await check_password(db, user, password):
         raise HTTPException(status_code=401, detail="Invalid password")
     
+    token = issue_token(user)
     return {
         "status": "success",
         "user_id": user.id,
-        "username": user.username
+        "username": user.username,
+        "access_token": encode_token(token),
+        "token_type": "bearer",
+        "expires_at": token.expires_at
+    }
+
+@app.post("/logout")
+async def logout(token: SessionToken = Depends(get_current_token)):
+    revoke_token(token)
+    return {"status": "success"}
+
+@app.post("/change_password")
+async def change_password(
+    old_password: str = Form(...),
+    new_password: str = Form(...),
+    current_user: CachedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    user = await authenticate_user(db, current_user.username, old_password)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid password")
+    
+    user.hashed_password = await passwords.hash_in_pool(new_password)
+    user.password_changed_at = datetime.utcnow()
+    await db.commit()
+    # Tokens carry a fingerprint of the old password_changed_at, so dropping
+    # the cached record is enough to reject every session issued before the change
+    invalidate_user(user.id)
+    
+    token = issue_token(user)
+    return {
+        "status": "success",
+        "access_token": encode_token(token),
+        "token_type": "bearer",
+        "expires_at": token.expires_at
     }
 
 @app.post("/mood")
 async def log_mood(
-    username: str = Form(...),
-    password: str = Form(...),
     score: int = Form(..., ge=1, le=10),  # Score between 1-10
     notes: Optional[str] = Form(None),
-    db: Session = Depends(get_db)
+    user: CachedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    # Authenticate user
-    user = authenticate_user(db, username, password)
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid credentials"
+    created_at = datetime.utcnow()
+    if write_buffer is not None:
+        await write_buffer.submit("mood", user.id, {"score": score, "notes": notes, "created_at": created_at})
+    else:
+        # Create mood entry
+        mood_entry = MoodEntry(
+            user_id=user.id,
+            score=score,
+            notes=notes,
+            created_at=created_at
         )
-    
-    # Create mood entry
-    mood_entry = MoodEntry(
-        user_id=user.id,
-        score=score,
-        notes=notes,
-        created_at=datetime.utcnow()
-    )
-    db.add(mood_entry)
-    db.commit()
+        db.add(mood_entry)
+        # Rollups are written in the same transaction, so /insights never sees a partial update
+        for stmt in rollups.mood_rollup_statements(db.bind.dialect.name, user.id, [(score, created_at)]):
+            await db.execute(stmt)
+        await db.commit()
+        await publish_entries(user.id, {"mood": [mood_entry]})
     
     return {
         "status": "success",
         "message": "Mood logged successfully",
         "score": score,
-        "timestamp": mood_entry.created_at.isoformat()
+        "timestamp": created_at.isoformat()
     }
 
 @app.post("/activity")
 async def log_activity(
-    username: str = Form(...),
-    password: str = Form(...),
     activity: str = Form(...),
     duration: int = Form(...),
-    db: Session = Depends(get_db)
+    user: CachedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = authenticate_user(db, username, password)
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
-    entry = ActivityEntry(
-        user_id=user.id,
-        activity=activity,
-        duration=duration,
-        created_at=datetime.utcnow()
-    )
+    values = {
+        "activity": activity,
+        "activity_key": activities.normalize_activity(activity),
+        "duration": duration,
+        "created_at": datetime.utcnow()
+    }
+    if write_buffer is not None:
+        await write_buffer.submit("activity", user.id, values)
+        return {"status": "success"}
+    entry = ActivityEntry(user_id=user.id, **values)
     db.add(entry)
-    db.commit()
+    await db.commit()
+    await publish_entries(user.id, {"activity": [entry]})
     return {"status": "success"}
 
 
 @app.post("/journal")
 async def log_journal(
-    username: str = Form(...),
-    password: str = Form(...),
     entry: str = Form(...),
-    db: Session = Depends(get_db)
+    user: CachedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = authenticate_user(db, username, password)
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    if write_buffer is not None:
+        await write_buffer.submit("journal", user.id, {"entry": entry, "created_at": datetime.utcnow()})
+        return {"status": "success"}
     journal = JournalEntry(
         user_id=user.id,
         entry=entry,
         created_at=datetime.utcnow()
     )
     db.add(journal)
-    db.commit()
+    await db.commit()
+    await publish_entries(user.id, {"journal": [journal]})
     return {"status": "success"}
 
+@app.post("/batch")
+async def log_batch(
+    items: List[BatchItem] = Body(..., min_length=1, max_length=MAX_BATCH_SIZE),
+    user: CachedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Mixed mood/activity/journal entries, written with bulk inserts in one transaction
+    created, results = await ingest.write_entries(db, user.id, items)
+    await publish_entries(user.id, created)
+    return {
+        "status": "success",
+        "created": {entry_type: len(rows) for entry_type, rows in created.items()},
+        "items": results
+    }
+
+@app.get("/events")
+async def events(user: CachedUser = Depends(get_current_user)):
+    # Server-Sent Events: entries committed by any of the user's clients are
+    # pushed as they happen, in the same per-kind shape as /changes
+    queue = pubsub.broker.subscribe(user.id)
+
+    async def stream():
+        try:
+            yield ": connected\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle stream
+                    yield ": keep-alive\n\n"
+                    continue
+                yield b"event: %s\ndata: %s\n\n" % (message["event"].encode(), orjson.dumps(message["data"]))
+        finally:
+            pubsub.broker.unsubscribe(user.id, queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/export")
+async def export_entries(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    types: str = "mood,activity,journal",
+    user: CachedUser = Depends(get_current_user)
+):
+    # Every entry the user has, streamed in chunks; memory use does not grow with account size
+    kinds = {kind.strip() for kind in types.split(",")}
+    if not kinds <= {name for name, _, _ in changes.FEEDS}:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unknown entry type")
+    body = export.export_csv(user.id, kinds) if format == "csv" else export.export_ndjson(user.id, kinds)
+    return StreamingResponse(
+        body,
+        media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{user.username}-entries.{format}"'}
+    )
+
+@app.post("/import")
+async def import_entries(
+    request: Request,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    user: CachedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Accepts the output of /export; the body is parsed as it streams in and
+    # written through the bulk path. Rows already in the account (same
+    # client_key, or same id and contents) are reported as duplicates
+    async def published(created):
+        await publish_entries(user.id, created)
+
+    summary = await export.import_entries(db, user.id, request.stream(), format, on_written=published)
+    return {"status": "success", **summary}
+
 @app.get("/insights/{username}")
 async def get_insights(
     username: str,
-    password: str = Form(...),
-    db: Session = Depends(get_db)
+    user: CachedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    # Authenticate
-    user = authenticate_user(db, username, password)
-    if not user:
+    require_same_user(user, username)
+    
+    summary = await rollups.mood_summary(db, user.id)
+    
+    if summary is None:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid credentials"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No mood entries found"
         )
     
-    # Get user's mood entries
-    entries = db.query(MoodEntry).filter(MoodEntry.user_id == user.id).all()
+    return {"username": username, **summary}
+
+@app.get("/insights/{username}/trends")
+async def get_mood_trends(
+    username: str,
+    range: Literal["7d", "30d", "90d", "1y", "all"] = "90d",
+    user: CachedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Rolling averages, weekly/monthly buckets, weekday pattern, streaks and
+    # activity-mood correlation, computed with NumPy over column-only queries
+    require_same_user(user, username)
+    
+    trends = await analytics.mood_trends(db, user.id, range)
     
-    if not entries:
+    if trends is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No mood entries found"
         )
     
-    scores = [entry.score for entry in entries]
-    
-    return {
-        "username": username,
-        "entry_count": len(entries),
-        "average_mood": sum(scores)/len(scores),
-        "last_7_days": [e.score for e in entries[-7:]]
-    }
+    return ORJSONResponse({"username": username, "range": range, **trends})
 
 @app.get("/mood_chart/{username}")
 async def mood_chart(
     username: str,
-    password: str = Form(...),
-    db: Session = Depends(get_db)
+    format: Literal["json", "png"] = "json",
+    width: int = Query(charts.DEFAULT_WIDTH, ge=200, le=2000),
+    height: int = Query(charts.DEFAULT_HEIGHT, ge=100, le=1000),
+    if_none_match: Optional[str] = Header(None),
+    user: CachedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    # Authenticate
-    user = authenticate_user(db, username, password)
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid credentials"
-        )
+    require_same_user(user, username)
     
-    # Get user's mood entries
-    entries = db.query(MoodEntry).filter(MoodEntry.user_id == user.id).order_by(MoodEntry.created_at).all()
+    # Count and newest id are enough to decide whether a cached chart is current
+    entry_count, latest_id = (await db.execute(
+        select(func.count(MoodEntry.id), func.max(MoodEntry.id)).where(MoodEntry.user_id == user.id)
+    )).one()
     
-    if len(entries) < 2:
+    if entry_count < 2:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Need at least 2 entries to generate chart"
         )
     
-    # Prepare chart data
-    dates = [entry.created_at for entry in entries]
-    scores = [entry.score for entry in entries]
+    key = charts.ChartKey(user.id, latest_id, width, height)
+    headers = {"ETag": key.etag, "Cache-Control": "private, no-cache"}
+    if if_none_match == key.etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    async def load_points():
+        rows = (await db.execute(
+            select(MoodEntry.created_at, MoodEntry.score)
+            .where(MoodEntry.user_id == user.id)
+            .order_by(MoodEntry.created_at)
+        )).all()
+        return [row.created_at for row in rows], [row.score for row in rows]
     
-    # Generate plot
-    plt.figure(figsize=(10, 5))
-    plt.plot(dates, scores, 'b-o')
-    plt.title(f"Mood Trend for {username}")
-    plt.xlabel("Date")
-    plt.ylabel("Mood Score (1-10)")
-    plt.ylim(0, 11)
-    plt.grid(True)
+    png = await charts.get_mood_chart(key, load_points, f"Mood Trend for {username}")
     
-    # Save to bytes
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', dpi=100)
-    buf.seek(0)
-    plt.close()
+    if format == "png":
+        return Response(content=png, media_type="image/png", headers=headers)
     
-    return JSONResponse({
-        "chart": base64.b64encode(buf.read()).decode('utf-8'),
+    # format=png avoids the base64 overhead; JSON is kept for existing clients
+    return ORJSONResponse({
+        "chart": base64.b64encode(png).decode('utf-8'),
         "username": username
-    })
+    }, headers=headers)
 
 if __name__ == "__main__":
     import uvicorn
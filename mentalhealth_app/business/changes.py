@@ -0,0 +1,76 @@
+# changes.py
+# Delta sync. Entries are append-only and ids only grow, so a client's
+# position is just the highest id it has seen in each entry table; the
+# change feed returns rows above those watermarks, and history ETags are
+# derived from the newest id instead of from the serialized rows.
+import base64
+import hashlib
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, select
+
+from .models import ActivityEntry, JournalEntry, MoodEntry
+from .serializers import activity_to_dict, entry_columns, journal_to_dict, mood_to_dict
+
+FEEDS = (
+    ("mood", MoodEntry, mood_to_dict),
+    ("activity", ActivityEntry, activity_to_dict),
+    ("journal", JournalEntry, journal_to_dict),
+)
+
+MAX_CHANGES = 500
+
+
+def encode_watermarks(marks: dict) -> str:
+    raw = ":".join(str(marks.get(name, 0)) for name, _, _ in FEEDS)
+    return base64.urlsafe_b64encode(raw.encode()).rstrip(b"=").decode("ascii")
+
+
+def decode_watermarks(cursor: str) -> dict:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        values = [int(v) for v in raw.split(":")]
+        if len(values) != len(FEEDS):
+            raise ValueError(raw)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return {name: value for (name, _, _), value in zip(FEEDS, values)}
+
+
+async def latest_ids(db, user_id: int) -> dict:
+    marks = {}
+    for name, model, _ in FEEDS:
+        marks[name] = await db.scalar(select(func.max(model.id)).where(model.user_id == user_id)) or 0
+    return marks
+
+
+async def current_cursor(db, user_id: int) -> str:
+    return encode_watermarks(await latest_ids(db, user_id))
+
+
+async def changes_since(db, user_id: int, cursor: str, limit: int = MAX_CHANGES) -> dict:
+    """Entries created after the cursor's watermarks, oldest first, per table."""
+    marks = decode_watermarks(cursor)
+    result = {"has_more": False}
+    for name, model, to_dict in FEEDS:
+        entries = (await db.execute(
+            select(*entry_columns(model))
+            .where(model.user_id == user_id, model.id > marks[name])
+            .order_by(model.id)
+            .limit(limit + 1)
+        )).all()
+        if len(entries) > limit:
+            entries = entries[:limit]
+            result["has_more"] = True
+        if entries:
+            marks[name] = entries[-1].id
+        result[name] = [to_dict(entry) for entry in entries]
+    result["next_cursor"] = encode_watermarks(marks)
+    return result
+
+
+async def history_etag(db, model, user_id: int, *params) -> str:
+    # Any new entry raises max(id), which changes every page's tag
+    latest = await db.scalar(select(func.max(model.id)).where(model.user_id == user_id)) or 0
+    raw = ":".join(str(p) for p in (model.__tablename__, user_id, latest, *params))
+    return '"' + hashlib.sha1(raw.encode()).hexdigest() + '"'
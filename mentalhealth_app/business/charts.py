@@ -0,0 +1,130 @@
+# charts.py
+import asyncio
+import hashlib
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+
+from matplotlib.figure import Figure
+
+from mentalhealth_app.settings import settings
+from .cache import LRUCache
+
+CHART_WORKERS = settings.chart_workers
+CHART_CACHE_SIZE = settings.chart_cache_size
+
+DEFAULT_WIDTH = 1000
+DEFAULT_HEIGHT = 500
+DPI = 100
+
+
+@dataclass(frozen=True)
+class ChartKey:
+    user_id: int
+    latest_entry_id: int
+    width: int
+    height: int
+
+    @property
+    def etag(self) -> str:
+        # Entries are append-only, so the newest id identifies the chart contents
+        raw = f"mood:{self.user_id}:{self.latest_entry_id}:{self.width}x{self.height}"
+        return '"' + hashlib.sha1(raw.encode()).hexdigest() + '"'
+
+
+chart_cache = LRUCache(maxsize=CHART_CACHE_SIZE)
+
+_pool = None
+_in_flight = {}  # ChartKey -> asyncio.Future, so concurrent misses render once
+
+
+def render_mood_chart(dates, scores, title, width, height) -> bytes:
+    # Object-oriented API only: pyplot's global state is not safe to share
+    fig = Figure(figsize=(width / DPI, height / DPI), dpi=DPI)
+    ax = fig.add_subplot()
+    ax.plot(dates, scores, 'b-o')
+    ax.set_title(title)
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Mood Score (1-10)")
+    ax.set_ylim(0, 11)
+    ax.grid(True)
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=DPI)
+    return buf.getvalue()
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn keeps workers independent of the server's threads and event loop
+        _pool = ProcessPoolExecutor(
+            max_workers=CHART_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def get_mood_chart(key: ChartKey, load_points, title: str) -> bytes:
+    """Return the PNG for key, rendering it in the process pool on a cache miss.
+
+    load_points is an async callable returning (dates, scores); it is only
+    awaited when the chart actually has to be rendered. Concurrent misses for
+    the same key wait for one render; if the request doing it is cancelled, a
+    waiter takes over, and after a failed render each waiter tries once more.
+    """
+    retried = False
+    while True:
+        png = chart_cache.get(key)
+        if png is not None:
+            return png
+
+        pending = _in_flight.get(key)
+        if pending is None:
+            return await _render(key, load_points, title)
+        try:
+            # Only cancels this waiter if it is cancelled itself
+            png = await asyncio.shield(pending)
+        except Exception:
+            if retried:
+                raise
+            retried = True
+            continue
+        if png is not None:
+            return png
+        # None: the rendering request was cancelled before it finished
+
+
+async def _render(key: ChartKey, load_points, title: str) -> bytes:
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    _in_flight[key] = future
+    try:
+        dates, scores = await load_points()
+        png = await loop.run_in_executor(
+            get_pool(), render_mood_chart, dates, scores, title, key.width, key.height
+        )
+        chart_cache.set(key, png)
+        future.set_result(png)
+        return png
+    except asyncio.CancelledError:
+        # Waiters were not cancelled; None tells them to render it themselves
+        future.set_result(None)
+        raise
+    except Exception as exc:
+        if isinstance(exc, BrokenProcessPool):
+            shutdown_pool()  # A worker died; start a fresh pool on the next request
+        future.set_exception(exc)
+        future.exception()  # Mark as retrieved when nobody else is waiting
+        raise
+    finally:
+        del _in_flight[key]
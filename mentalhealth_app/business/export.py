@@ -0,0 +1,241 @@
+# export.py
+# Full-account export and the matching import. Exports stream rows straight
+# from a server-side cursor (yield_per) into the response, so memory stays
+# flat however large the account is; imports parse the request body as it
+# arrives and hand it to the bulk write path in fixed-size chunks.
+import csv
+import io
+import uuid
+from typing import Optional
+
+import orjson
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import select
+
+from mentalhealth_app.data.database import AsyncSessionLocal
+
+from . import ingest
+from .changes import FEEDS
+from .schemas import BatchItem
+from .serializers import FIELDS, entry_columns
+
+EXPORT_CHUNK = 1000
+IMPORT_CHUNK = 1000
+MAX_REPORTED_ERRORS = 100
+# Stay well under SQLite's bound-parameter limit in IN (...) lookups
+_ID_CHUNK = 500
+# Longer lines (and CSV records) are reported as errors instead of being buffered
+MAX_LINE_BYTES = 1024 * 1024
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+CSV_COLUMNS = ("type", "id", "created_at", "score", "notes", "activity", "duration", "entry", "client_key")
+
+_batch_item = TypeAdapter(BatchItem)
+
+
+async def _export_rows(user_id: int, kinds):
+    # The request's own session is closed before a StreamingResponse starts
+    # sending, so the export reads through a session of its own
+    async with AsyncSessionLocal() as db:
+        for name, model, to_dict in FEEDS:
+            if name not in kinds:
+                continue
+            result = await db.stream(
+                select(*entry_columns(model))
+                .where(model.user_id == user_id)
+                .order_by(model.id)
+                .execution_options(yield_per=EXPORT_CHUNK)
+            )
+            async for rows in result.partitions():
+                yield name, [to_dict(row) for row in rows]
+
+
+async def export_ndjson(user_id: int, kinds):
+    async for name, records in _export_rows(user_id, kinds):
+        yield b"".join(
+            orjson.dumps({"type": name, **record}, option=orjson.OPT_APPEND_NEWLINE) for record in records
+        )
+
+
+async def export_csv(user_id: int, kinds):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, CSV_COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    async for name, records in _export_rows(user_id, kinds):
+        for record in records:
+            record["created_at"] = record["created_at"].isoformat()
+            writer.writerow({"type": name, **record})
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _line_too_long():
+    return ValueError(f"Line longer than {MAX_LINE_BYTES} bytes")
+
+
+def _decode(line: bytes):
+    try:
+        return line.decode("utf-8").rstrip("\r")
+    except UnicodeDecodeError as exc:
+        return ValueError(f"Invalid UTF-8 at byte {exc.start}")
+
+
+async def _lines(chunks):
+    """Yield one str per line of the body, or a ValueError for a line that can't be read."""
+    pending = b""
+    too_long = False  # Dropping the rest of an over-long line
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            if too_long:
+                too_long = False
+                continue
+            yield _decode(line) if len(line) <= MAX_LINE_BYTES else _line_too_long()
+        if len(pending) > MAX_LINE_BYTES:
+            if not too_long:
+                yield _line_too_long()
+                too_long = True
+            pending = b""
+    if pending and not too_long:
+        yield _decode(pending)
+
+
+async def _ndjson_records(chunks):
+    number = 0
+    async for line in _lines(chunks):
+        number += 1
+        if isinstance(line, Exception):
+            yield number, line
+        elif line.strip():
+            try:
+                yield number, orjson.loads(line)
+            except orjson.JSONDecodeError as exc:
+                yield number, exc
+
+
+async def _csv_records(chunks):
+    header = None
+    record, start, number = "", 0, 0
+    async for line in _lines(chunks):
+        number += 1
+        if isinstance(line, Exception):
+            # Drops any record this line belonged to
+            yield start or number, line
+            record, start = "", 0
+            continue
+        record = f"{record}\n{line}" if record else line
+        start = start or number
+        # A quoted field may span lines; a record is complete once its quotes balance
+        if record.count('"') % 2:
+            if len(record) > MAX_LINE_BYTES:
+                yield start, ValueError(f"Record longer than {MAX_LINE_BYTES} bytes; unterminated quoted field?")
+                record, start = "", 0
+            continue
+        values = next(csv.reader([record]))
+        if header is None:
+            header = values
+        elif any(values):
+            yield start, {key: value for key, value in zip(header, values) if value != ""}
+        record, start = "", 0
+    if record:
+        yield start, ValueError("Unterminated quoted field")
+
+
+def _source_id(record: dict) -> Optional[int]:
+    # The row id of an exported entry that was stored without a client_key
+    if record.get("idempotency_key") or record.get("client_key"):
+        return None
+    try:
+        return int(record["id"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _to_item(record: dict):
+    record = dict(record)
+    if not record.get("idempotency_key"):
+        if record.get("client_key"):
+            record["idempotency_key"] = record["client_key"]
+        elif record.get("id") not in (None, ""):
+            # Importing the same export into another account twice is a no-op
+            record["idempotency_key"] = f"import:{record.get('type')}:{record['id']}"
+        else:
+            # Nothing identifies the row, so it can never be recognised as a re-import
+            record["idempotency_key"] = f"import:{uuid.uuid4().hex}"
+    return _batch_item.validate_python(record)
+
+
+async def _already_stored(db, user_id: int, batch) -> set:
+    """Positions in batch of rows that are the user's own entries, exported without a client_key.
+
+    Those rows are keyed by their id, which no stored entry carries, so they
+    are matched on (type, id) instead - and on their contents, since the same
+    id may belong to an unrelated entry when the file came from another database.
+    """
+    stored = set()
+    for name, model, _ in FEEDS:
+        ids = {source_id: i for i, (item, source_id) in enumerate(batch) if item.type == name and source_id is not None}
+        if not ids:
+            continue
+        fields = [f for f in FIELDS[model.__tablename__] if f not in ("id", "client_key")]
+        id_list = list(ids)
+        for start in range(0, len(id_list), _ID_CHUNK):
+            rows = await db.execute(
+                select(*entry_columns(model))
+                .where(model.user_id == user_id, model.id.in_(id_list[start:start + _ID_CHUNK]))
+            )
+            for row in rows:
+                i = ids[row.id]
+                if all(getattr(row, f) == getattr(batch[i][0], f) for f in fields):
+                    stored.add(i)
+    return stored
+
+
+async def import_entries(db, user_id: int, chunks, fmt: str, on_written=None):
+    """Import an NDJSON or CSV export from an async iterator of body bytes.
+
+    Rows are written IMPORT_CHUNK at a time through ingest.write_entries;
+    invalid rows are skipped and reported. Returns a summary dict.
+    """
+    records = _csv_records(chunks) if fmt == "csv" else _ndjson_records(chunks)
+    summary = {"created": {name: 0 for name, _, _ in FEEDS}, "duplicates": 0, "invalid": 0, "errors": []}
+    batch = []
+
+    async def flush():
+        stored = await _already_stored(db, user_id, batch)
+        items = [item for i, (item, _) in enumerate(batch) if i not in stored]
+        summary["duplicates"] += len(stored)
+        batch.clear()
+        if not items:
+            return
+        created, results = await ingest.write_entries(db, user_id, items)
+        for name, rows in created.items():
+            summary["created"][name] += len(rows)
+        summary["duplicates"] += sum(result["status"] == "duplicate" for result in results)
+        if on_written:
+            await on_written(created)
+
+    async for number, record in records:
+        error: Optional[str] = None
+        if isinstance(record, Exception):
+            error = str(record)
+        elif not isinstance(record, dict):
+            error = "Expected an object"
+        else:
+            try:
+                batch.append((_to_item(record), _source_id(record)))
+            except ValidationError as exc:
+                error = "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in exc.errors())
+        if error:
+            summary["invalid"] += 1
+            if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+                summary["errors"].append({"line": number, "error": error})
+        if len(batch) >= IMPORT_CHUNK:
+            await flush()
+    if batch:
+        await flush()
+    return summary
@@ -0,0 +1,88 @@
+# ingest.py
+# Bulk write path: one INSERT per entry type and one commit for a whole batch
+from datetime import datetime
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from . import rollups
+from .activities import normalize_activity
+from .models import ActivityEntry, JournalEntry, MoodEntry
+
+MODELS = {"mood": MoodEntry, "activity": ActivityEntry, "journal": JournalEntry}
+
+# Stay well under SQLite's bound-parameter limit in IN (...) lookups
+_KEY_CHUNK = 500
+
+
+def _row(user_id, item, now):
+    row = item.model_dump(exclude={"type", "idempotency_key"})
+    row["user_id"] = user_id
+    row["client_key"] = item.idempotency_key
+    row["created_at"] = item.created_at or now
+    if item.type == "activity":
+        row["activity_key"] = normalize_activity(item.activity)
+    return row
+
+
+async def _existing_keys(db, model, user_id, keys):
+    found = {}
+    for i in range(0, len(keys), _KEY_CHUNK):
+        rows = await db.execute(
+            select(model.client_key, model.id)
+            .where(model.user_id == user_id, model.client_key.in_(keys[i:i + _KEY_CHUNK]))
+        )
+        found.update(rows.tuples().all())
+    return found
+
+
+async def _write(db, user_id, items):
+    now = datetime.utcnow()
+    results = {}  # (type, idempotency_key) -> result dict
+    created = {}  # entry type -> inserted ORM rows
+
+    for entry_type, model in MODELS.items():
+        pending = {}
+        for item in items:
+            if item.type == entry_type and item.idempotency_key not in pending:
+                pending[item.idempotency_key] = item
+        if not pending:
+            continue
+
+        existing = await _existing_keys(db, model, user_id, list(pending))
+        for key, entry_id in existing.items():
+            results[entry_type, key] = {"idempotency_key": key, "type": entry_type, "id": entry_id, "status": "duplicate"}
+
+        rows = [_row(user_id, item, now) for key, item in pending.items() if key not in existing]
+        if not rows:
+            continue
+        inserted = (await db.scalars(insert(model).returning(model), rows)).all()
+        created[entry_type] = inserted
+        for entry in inserted:
+            results[entry_type, entry.client_key] = {
+                "idempotency_key": entry.client_key, "type": entry_type, "id": entry.id, "status": "created"
+            }
+
+    moods = created.get("mood", [])
+    for stmt in rollups.mood_rollup_statements(
+        db.bind.dialect.name, user_id, [(m.score, m.created_at) for m in moods]
+    ):
+        await db.execute(stmt)
+
+    await db.commit()
+    return created, [results[item.type, item.idempotency_key] for item in items]
+
+
+async def write_entries(db, user_id, items):
+    """Insert validated batch items for one user in a single transaction.
+
+    Returns (created, results): the inserted rows grouped by entry type and a
+    per-item status list in request order. Items whose idempotency key is
+    already stored are reported as duplicates and not written again.
+    """
+    try:
+        return await _write(db, user_id, items)
+    except IntegrityError:
+        # A concurrent request stored one of the keys first; the retry sees it
+        await db.rollback()
+        return await _write(db, user_id, items)
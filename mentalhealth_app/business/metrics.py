@@ -0,0 +1,224 @@
+# metrics.py
+# Request and database instrumentation, exposed in the Prometheus text format
+# on /metrics. The middleware times every request under its route template
+# (so /insights/{username} is one series, not one per user), counts statuses
+# and tracks requests in flight. SQLAlchemy cursor events add each statement's
+# time to the request that issued it through a context variable, and requests
+# slower than slow_request_ms are logged together with the SQL they ran.
+import contextvars
+import logging
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Starlette appends "; charset=utf-8" to text/ media types
+CONTENT_TYPE = "text/plain; version=0.0.4"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+# Requests that matched no route share one series instead of one per path
+UNMATCHED_ROUTE = "<unmatched>"
+MAX_LOGGED_STATEMENTS = 50
+MAX_STATEMENT_LENGTH = 500
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class RequestStats:
+    """Statements run on behalf of one request."""
+
+    __slots__ = ("queries", "query_seconds", "statements")
+
+    def __init__(self, record_sql=False):
+        self.queries = 0
+        self.query_seconds = 0.0
+        # (seconds, sql) pairs, kept only when the slow-request log is on
+        self.statements = [] if record_sql else None
+
+
+_request_stats = contextvars.ContextVar("request_stats", default=None)
+
+
+class Registry:
+    def __init__(self):
+        self.requests = defaultdict(int)  # (method, route, status) -> count
+        self.latency = defaultdict(lambda: Histogram(LATENCY_BUCKETS))  # (method, route)
+        self.in_flight = defaultdict(int)  # method -> requests being served
+        self.route_queries = defaultdict(int)  # route -> statements
+        self.route_query_seconds = defaultdict(float)  # route -> seconds in the database
+        self.query_latency = Histogram(QUERY_BUCKETS)
+        self.db_errors = defaultdict(int)  # "locked" / "other" -> failed statements
+        self.caches = {}  # name -> LRUCache
+
+    def register_cache(self, name: str, cache):
+        self.caches[name] = cache
+
+    def observe_request(self, method, route, status_code, seconds, stats: RequestStats):
+        self.requests[(method, route, status_code)] += 1
+        self.latency[(method, route)].observe(seconds)
+        if stats.queries:
+            self.route_queries[route] += stats.queries
+            self.route_query_seconds[route] += stats.query_seconds
+
+    def render(self) -> str:
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def histogram(name, labels, hist):
+            cumulative = 0
+            for bound, count in zip(hist.buckets, hist.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels, le=_number(bound))} {cumulative}")
+            cumulative += hist.counts[-1]
+            lines.append(f'{name}_bucket{_labels(labels, le="+Inf")} {cumulative}')
+            lines.append(f"{name}_sum{_labels(labels)} {_number(hist.sum)}")
+            lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+
+        family("mentalhealth_http_requests_total", "counter", "HTTP requests by route and status.")
+        for (method, route, status_code), count in sorted(self.requests.items()):
+            labels = {"method": method, "route": route, "status": status_code}
+            lines.append(f"mentalhealth_http_requests_total{_labels(labels)} {count}")
+
+        family("mentalhealth_http_request_duration_seconds", "histogram", "HTTP request latency by route.")
+        for (method, route), hist in sorted(self.latency.items()):
+            histogram("mentalhealth_http_request_duration_seconds", {"method": method, "route": route}, hist)
+
+        family("mentalhealth_http_requests_in_progress", "gauge", "HTTP requests currently being served.")
+        for method, count in sorted(self.in_flight.items()):
+            lines.append(f"mentalhealth_http_requests_in_progress{_labels({'method': method})} {count}")
+
+        family("mentalhealth_db_queries_total", "counter", "SQL statements run by requests, by route.")
+        for route, count in sorted(self.route_queries.items()):
+            lines.append(f"mentalhealth_db_queries_total{_labels({'route': route})} {count}")
+
+        family("mentalhealth_db_query_seconds_total", "counter", "Time requests spent in SQL statements, by route.")
+        for route, seconds in sorted(self.route_query_seconds.items()):
+            lines.append(f"mentalhealth_db_query_seconds_total{_labels({'route': route})} {_number(seconds)}")
+
+        family("mentalhealth_db_query_duration_seconds", "histogram", "Latency of individual SQL statements.")
+        histogram("mentalhealth_db_query_duration_seconds", {}, self.query_latency)
+
+        family("mentalhealth_db_errors_total", "counter", "Failed SQL statements; kind=locked is SQLite lock contention.")
+        for kind in ("locked", "other"):
+            lines.append(f"mentalhealth_db_errors_total{_labels({'kind': kind})} {self.db_errors[kind]}")
+
+        for name, kind, help_text, value in (
+            ("mentalhealth_cache_hits_total", "counter", "Cache lookups that found an entry.", lambda c: c.hits),
+            ("mentalhealth_cache_misses_total", "counter", "Cache lookups that missed.", lambda c: c.misses),
+            ("mentalhealth_cache_entries", "gauge", "Entries currently cached.", len),
+        ):
+            family(name, kind, help_text)
+            for cache_name, cache in sorted(self.caches.items()):
+                lines.append(f"{name}{_labels({'cache': cache_name})} {value(cache)}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict, **extra) -> str:
+    labels = {**labels, **extra}
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+registry = Registry()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_metrics_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    registry.query_latency.observe(elapsed)
+    stats = _request_stats.get()
+    if stats is None:
+        return
+    stats.queries += 1
+    stats.query_seconds += elapsed
+    if stats.statements is not None and len(stats.statements) < MAX_LOGGED_STATEMENTS:
+        stats.statements.append((elapsed, " ".join(statement.split())[:MAX_STATEMENT_LENGTH]))
+
+
+def _handle_error(context):
+    # SQLite gives up with "database is locked" once busy_timeout runs out
+    # waiting for another connection's write lock
+    locked = "locked" in str(context.original_exception)
+    registry.db_errors["locked" if locked else "other"] += 1
+
+
+def instrument_engine(engine):
+    """Time every statement run through a (sync) Engine - pass async_engine.sync_engine for the async one."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+class MetricsMiddleware:
+    def __init__(self, app, slow_request_ms=0):
+        self.app = app
+        self.slow_request_seconds = slow_request_ms / 1000
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        stats = RequestStats(record_sql=self.slow_request_seconds > 0)
+        status_code = 500  # Unless the app starts a response, it failed
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        token = _request_stats.set(stats)
+        registry.in_flight[method] += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            registry.in_flight[method] -= 1
+            _request_stats.reset(token)
+            # The router stores the matched route in the (shared) scope
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            registry.observe_request(method, route, status_code, elapsed, stats)
+            if self.slow_request_seconds and elapsed >= self.slow_request_seconds:
+                _log_slow_request(method, scope.get("path", route), status_code, elapsed, stats)
+
+
+def _log_slow_request(method, path, status_code, elapsed, stats: RequestStats):
+    statements = "".join(f"\n  {seconds * 1000:8.1f} ms  {sql}" for seconds, sql in stats.statements or ())
+    logger.warning(
+        "Slow request: %s %s -> %s in %.1f ms (%d queries, %.1f ms in SQL)%s",
+        method, path, status_code, elapsed * 1000, stats.queries, stats.query_seconds * 1000, statements,
+    )
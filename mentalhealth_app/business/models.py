@@ -1,6 +1,6 @@
 # models.py
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, Date, DateTime, Index
 from mentalhealth_app.data.database import Base  # Correct import from database module
 
 class User(Base):
@@ -11,27 +11,70 @@ class User(Base):
     email = Column(String, index=True)  # Remove unique=True here
     hashed_password = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Session tokens are tied to this, not to the hash, so upgrading a hash
+    # on login keeps the user's other sessions valid
+    password_changed_at = Column(DateTime, default=datetime.utcnow)
 
+# History, insights and chart queries filter by user_id and order by
+# (created_at, id); these composite indexes serve them without a sort.
+# Existing databases get them through data/migrations.py.
 class MoodEntry(Base):
     __tablename__ = "mood_entries"
+    __table_args__ = (
+        # score is included so the insights and chart queries are index-only
+        Index("ix_mood_entries_user_created", "user_id", "created_at", "id", "score"),
+        Index("ux_mood_entries_client_key", "user_id", "client_key", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, index=True)
     score = Column(Integer)
     notes = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    client_key = Column(String, nullable=True)  # Idempotency key from /batch
 
 class ActivityEntry(Base):
     __tablename__ = "activity_entries"
+    __table_args__ = (
+        # activity_key and duration are included so activity totals are index-only,
+        # by date range across activities or (next index) for one activity
+        Index("ix_activity_entries_user_created", "user_id", "created_at", "id", "activity_key", "duration"),
+        Index("ux_activity_entries_client_key", "user_id", "client_key", unique=True),
+        Index("ix_activity_entries_user_key_created", "user_id", "activity_key", "created_at", "duration"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, index=True)
     activity = Column(String)
+    activity_key = Column(String, nullable=True)  # Normalized activity name for grouping
     duration = Column(Integer)
     created_at = Column(DateTime, default=datetime.utcnow)
+    client_key = Column(String, nullable=True)
 
 class JournalEntry(Base):
     __tablename__ = "journal_entries"
+    __table_args__ = (
+        Index("ix_journal_entries_user_created", "user_id", "created_at", "id"),
+        Index("ux_journal_entries_client_key", "user_id", "client_key", unique=True),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, index=True)
     entry = Column(String)
-    created_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    created_at = Column(DateTime, default=datetime.utcnow)
+    client_key = Column(String, nullable=True)
+
+# Rollups maintained by rollups.py in the same transaction as each mood entry
+class MoodUserStats(Base):
+    __tablename__ = "mood_user_stats"
+    user_id = Column(Integer, primary_key=True)
+    entry_count = Column(Integer, nullable=False, default=0)
+    score_sum = Column(Integer, nullable=False, default=0)
+    last_entry_at = Column(DateTime)
+
+class MoodDailyRollup(Base):
+    __tablename__ = "mood_daily_rollups"
+    user_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True)
+    entry_count = Column(Integer, nullable=False, default=0)
+    score_sum = Column(Integer, nullable=False, default=0)
+    score_min = Column(Integer)
+    score_max = Column(Integer)
\ No newline at end of file
@@ -0,0 +1,46 @@
+# pagination.py
+# Keyset pagination over (created_at, id), newest first. The cursor points at
+# the last row of the previous page, so each page is a single index range
+# scan no matter how far back the client has scrolled.
+import base64
+from datetime import datetime
+
+from fastapi import HTTPException, status
+from sqlalchemy import select, tuple_
+
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(created_at: datetime, entry_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{entry_id}".encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, entry_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(entry_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+async def fetch_page(db, model, user_id: int, limit: int, cursor: str = None, columns=None):
+    """Return (entries, next_cursor) for one page of model rows owned by user_id.
+
+    With `columns` (which must include created_at and id) rows are returned
+    as lightweight result rows instead of ORM objects.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    query = select(*columns) if columns else select(model)
+    query = query.where(model.user_id == user_id)
+    if cursor:
+        query = query.where(tuple_(model.created_at, model.id) < tuple_(*decode_cursor(cursor)))
+    query = query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1)
+
+    result = await db.execute(query)
+    entries = result.all() if columns else result.scalars().all()
+    if len(entries) <= limit:
+        return entries, None
+    entries = entries[:limit]
+    return entries, encode_cursor(entries[-1].created_at, entries[-1].id)
@@ -0,0 +1,145 @@
+# passwords.py
+# Password hashing. New hashes use settings.password_scheme: scrypt from the
+# standard library, or bcrypt / argon2 when the optional bcrypt / argon2-cffi
+# packages are installed. Stored hashes of every scheme still verify, as do
+# the plain "hashed_<password>" values of older databases; verify_password
+# reports those and hashes made with other settings as needing a rehash,
+# which login does with the password it has just checked.
+#
+# Hashing is deliberately slow, so it runs on a small thread pool of its own
+# (all three release the GIL) instead of the event loop. At most
+# password_hash_max_pending hashes may be running or queued; requests beyond
+# that get a 503 rather than waiting behind a growing backlog.
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException, status
+
+from mentalhealth_app.settings import settings
+
+try:
+    import bcrypt
+except ImportError:  # optional dependency
+    bcrypt = None
+
+try:
+    import argon2
+except ImportError:  # optional dependency
+    argon2 = None
+
+SCHEME = settings.password_scheme
+LEGACY_PREFIX = "hashed_"
+SCRYPT_PREFIX = "scrypt$"
+BCRYPT_PREFIXES = ("$2a$", "$2b$", "$2y$")
+ARGON2_PREFIX = "$argon2"
+
+if SCHEME == "bcrypt" and bcrypt is None:
+    raise RuntimeError("password_scheme 'bcrypt' needs the bcrypt package")
+if SCHEME == "argon2" and argon2 is None:
+    raise RuntimeError("password_scheme 'argon2' needs the argon2-cffi package")
+
+_argon2_hasher = argon2.PasswordHasher(
+    time_cost=settings.argon2_time_cost,
+    memory_cost=settings.argon2_memory_cost,
+    parallelism=settings.argon2_parallelism,
+) if argon2 is not None else None
+
+_pool = None
+_pending = 0  # hashes running or queued on _pool; only touched from the event loop
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    # OpenSSL refuses to use more than maxmem; scrypt needs about 128 * r * (n + p) bytes
+    maxmem = 128 * r * (n + p + 2) + 1024 * 1024
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=maxmem, dklen=32)
+
+
+def hash_password(password: str) -> str:
+    """Hash password with the configured scheme. Blocking - see hash_in_pool."""
+    if SCHEME == "bcrypt":
+        return bcrypt.hashpw(password.encode(), bcrypt.gensalt(settings.bcrypt_rounds)).decode()
+    if SCHEME == "argon2":
+        return _argon2_hasher.hash(password)
+    n, r, p = settings.scrypt_n, settings.scrypt_r, settings.scrypt_p
+    salt = os.urandom(16)
+    digest = _scrypt(password, salt, n, r, p)
+    return f"{SCRYPT_PREFIX}{n}${r}${p}${base64.b64encode(salt).decode()}${base64.b64encode(digest).decode()}"
+
+
+def verify_password(password: str, stored: str) -> tuple:
+    """(matches, needs_rehash) for password against a stored hash of any supported scheme."""
+    if not stored:
+        return False, False
+
+    if stored.startswith(LEGACY_PREFIX):
+        return hmac.compare_digest(stored.encode(), (LEGACY_PREFIX + password).encode()), True
+
+    if stored.startswith(SCRYPT_PREFIX):
+        try:
+            _, n, r, p, salt, digest = stored.split("$")
+            n, r, p = int(n), int(r), int(p)
+            salt, digest = base64.b64decode(salt), base64.b64decode(digest)
+        except ValueError:
+            return False, False
+        if not hmac.compare_digest(_scrypt(password, salt, n, r, p), digest):
+            return False, False
+        return True, SCHEME != "scrypt" or (n, r, p) != (settings.scrypt_n, settings.scrypt_r, settings.scrypt_p)
+
+    if stored.startswith(BCRYPT_PREFIXES):
+        if bcrypt is None:
+            raise RuntimeError("stored bcrypt hash, but the bcrypt package is not installed")
+        if not bcrypt.checkpw(password.encode(), stored.encode()):
+            return False, False
+        return True, SCHEME != "bcrypt" or int(stored.split("$")[2]) != settings.bcrypt_rounds
+
+    if stored.startswith(ARGON2_PREFIX):
+        if argon2 is None:
+            raise RuntimeError("stored argon2 hash, but the argon2-cffi package is not installed")
+        try:
+            _argon2_hasher.verify(stored, password)
+        except (argon2.exceptions.VerifyMismatchError, argon2.exceptions.InvalidHashError):
+            return False, False
+        return True, SCHEME != "argon2" or _argon2_hasher.check_needs_rehash(stored)
+
+    return False, False
+
+
+def get_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=settings.password_hash_workers, thread_name_prefix="password-hash")
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def _run(fn, *args):
+    global _pending
+    if _pending >= settings.password_hash_max_pending:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-ins in progress, try again shortly",
+            headers={"Retry-After": "1"},
+        )
+    _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(get_pool(), fn, *args)
+    finally:
+        _pending -= 1
+
+
+async def hash_in_pool(password: str) -> str:
+    return await _run(hash_password, password)
+
+
+async def verify_in_pool(password: str, stored: str) -> tuple:
+    return await _run(verify_password, password, stored)
@@ -0,0 +1,154 @@
+# profiling.py
+# Opt-in request profiling. A request is run under cProfile when it carries
+# "X-Profile: <admin token>" or is picked by the sampling rate; the raw stats
+# (<id>.prof, for pstats or snakeviz) and a small description (<id>.json) are
+# written to the profile directory, and the response names the profile in an
+# X-Profile-Id header. When profiling is off the middleware is not installed
+# at all, so normal requests pay nothing for it.
+#
+# cProfile follows the event loop thread, so while a request awaits, frames
+# from other requests served in the meantime are counted too - profile on a
+# quiet instance, or read the numbers with that in mind. Only one request is
+# profiled at a time; others are served normally while a profile runs.
+import asyncio
+import cProfile
+import hmac
+import io
+import itertools
+import json
+import os
+import pstats
+import random
+import re
+import time
+
+from fastapi import Header, HTTPException, status
+from starlette.datastructures import Headers
+
+from mentalhealth_app.settings import settings
+
+PROFILE_HEADER = "x-profile"
+# <date>-<time>-<pid>-<n>; the pid keeps workers sharing the directory apart
+# (ids from before it was added have no pid part)
+_PROFILE_ID = re.compile(r"^[0-9]{8}-[0-9]{6}(-[0-9]+){1,2}$")
+
+
+def _check_admin_token(token) -> bool:
+    # Bytes: compare_digest raises TypeError for non-ASCII str
+    return (
+        bool(settings.admin_token) and token is not None
+        and hmac.compare_digest(token.encode(), settings.admin_token.encode())
+    )
+
+
+def require_admin(x_admin_token: str = Header(None)):
+    # Without an admin token configured the admin endpoints do not exist
+    if not settings.admin_token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not _check_admin_token(x_admin_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin token required")
+
+
+class ProfilingMiddleware:
+    def __init__(self, app, sample_rate=0.0, directory=None, keep=100):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.directory = directory or settings.profiling_dir
+        self.keep = keep
+        self._active = False
+        self._counter = itertools.count(1)
+
+    def _trigger(self, scope):
+        if _check_admin_token(Headers(scope=scope).get(PROFILE_HEADER)):
+            return "header"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self._active:
+            await self.app(scope, receive, send)
+            return
+        trigger = self._trigger(scope)
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(self._counter)}"
+        status_code = 500
+
+        async def send_with_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", profile_id.encode("ascii"))]
+            await send(message)
+
+        self._active = True
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - started
+            self._active = False
+            info = {
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope.get("path"),
+                "route": getattr(scope.get("route"), "path", None),
+                "status": status_code,
+                "duration_ms": round(elapsed * 1000, 1),
+                "trigger": trigger,
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }
+            await asyncio.to_thread(self._save, profiler, info)
+
+    def _save(self, profiler, info):
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, info["id"])
+        profiler.dump_stats(base + ".prof")
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump(info, f)
+        # Keep only the newest profiles
+        for stale in list_profiles(self.directory)[self.keep:]:
+            for ext in (".prof", ".json"):
+                try:
+                    os.remove(os.path.join(self.directory, stale["id"] + ext))
+                except FileNotFoundError:
+                    pass
+
+
+def list_profiles(directory=None):
+    """Descriptions of the stored profiles, newest first."""
+    directory = directory or settings.profiling_dir
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in os.listdir(directory):
+        if name.endswith(".json"):
+            try:
+                with open(os.path.join(directory, name), encoding="utf-8") as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+    profiles.sort(key=lambda info: [int(part) for part in info["id"].split("-")], reverse=True)
+    return profiles
+
+
+def profile_path(profile_id: str, directory=None):
+    """Path of a stored .prof file, or None for unknown (or malformed) ids."""
+    if not _PROFILE_ID.match(profile_id):
+        return None
+    path = os.path.join(directory or settings.profiling_dir, profile_id + ".prof")
+    return path if os.path.exists(path) else None
+
+
+def summarize(path: str, sort: str = "cumulative", top: int = 30) -> str:
+    """pstats report of the top frames of a stored profile."""
+    out = io.StringIO()
+    stats = pstats.Stats(path, stream=out)
+    stats.strip_dirs().sort_stats(sort).print_stats(top)
+    return out.getvalue()
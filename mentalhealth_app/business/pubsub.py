@@ -0,0 +1,49 @@
+# pubsub.py
+# Per-user fan-out of newly committed entries to open /events streams.
+# Broker only reaches clients connected to this process; a multi-worker
+# deployment can swap in a shared implementation (e.g. Redis pub/sub) with
+# the same subscribe/unsubscribe/publish methods.
+import asyncio
+from collections import defaultdict
+
+QUEUE_SIZE = 100
+
+# Sent instead of an event a subscriber had no room for; the client then
+# catches up through /changes
+RESYNC = {"event": "resync", "data": {}}
+
+
+class Broker:
+    def __init__(self, queue_size: int = QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers = defaultdict(set)  # user_id -> {asyncio.Queue}
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[user_id].add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue):
+        queues = self._subscribers.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[user_id]
+
+    def subscriber_count(self, user_id: int) -> int:
+        return len(self._subscribers.get(user_id, ()))
+
+    async def publish(self, user_id: int, event: str, data: dict):
+        # Never blocks the writer: a client that stops reading loses events
+        # and is told to resync rather than holding up everyone else
+        message = {"event": event, "data": data}
+        for queue in list(self._subscribers.get(user_id, ())):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC)
+
+
+broker = Broker()
@@ -0,0 +1,169 @@
+# rollups.py
+from collections import defaultdict
+from dataclasses import dataclass
+
+from sqlalchemy import case, delete, func, insert, select
+
+from mentalhealth_app.data.database import dialect_insert
+from .models import MoodDailyRollup, MoodEntry, MoodUserStats
+
+
+@dataclass
+class DayStats:
+    count: int = 0
+    total: int = 0
+    low: int = None
+    high: int = None
+    last_at: object = None
+
+    def add(self, score, created_at):
+        self.count += 1
+        self.total += score
+        self.low = score if self.low is None else min(self.low, score)
+        self.high = score if self.high is None else max(self.high, score)
+        self.last_at = created_at if self.last_at is None else max(self.last_at, created_at)
+
+
+def _greatest(current, incoming):
+    return case((incoming > current, incoming), else_=current)
+
+
+def _least(current, incoming):
+    return case((incoming < current, incoming), else_=current)
+
+
+def mood_rollup_statements(dialect_name, user_id, entries):
+    """Upserts that fold (score, created_at) pairs into the rollup tables.
+
+    Execute them in the same transaction that inserts the entries so the
+    rollups can never drift from mood_entries.
+    """
+    days = defaultdict(DayStats)
+    for score, created_at in entries:
+        days[created_at.date()].add(score, created_at)
+    if not days:
+        return []
+
+    insert_ = dialect_insert(dialect_name)
+    statements = []
+    for day, stats in days.items():
+        stmt = insert_(MoodDailyRollup).values(
+            user_id=user_id,
+            day=day,
+            entry_count=stats.count,
+            score_sum=stats.total,
+            score_min=stats.low,
+            score_max=stats.high,
+        )
+        statements.append(stmt.on_conflict_do_update(
+            index_elements=[MoodDailyRollup.user_id, MoodDailyRollup.day],
+            set_={
+                "entry_count": MoodDailyRollup.entry_count + stmt.excluded.entry_count,
+                "score_sum": MoodDailyRollup.score_sum + stmt.excluded.score_sum,
+                "score_min": _least(MoodDailyRollup.score_min, stmt.excluded.score_min),
+                "score_max": _greatest(MoodDailyRollup.score_max, stmt.excluded.score_max),
+            },
+        ))
+
+    stmt = insert_(MoodUserStats).values(
+        user_id=user_id,
+        entry_count=sum(s.count for s in days.values()),
+        score_sum=sum(s.total for s in days.values()),
+        last_entry_at=max(s.last_at for s in days.values()),
+    )
+    statements.append(stmt.on_conflict_do_update(
+        index_elements=[MoodUserStats.user_id],
+        set_={
+            "entry_count": MoodUserStats.entry_count + stmt.excluded.entry_count,
+            "score_sum": MoodUserStats.score_sum + stmt.excluded.score_sum,
+            "last_entry_at": _greatest(MoodUserStats.last_entry_at, stmt.excluded.last_entry_at),
+        },
+    ))
+    return statements
+
+
+async def mood_summary(db, user_id):
+    """Insights for one user read from the rollups, or None without entries.
+
+    Totals come from the rollup row, so cost does not grow with history size.
+    """
+    stats = await db.get(MoodUserStats, user_id)
+    if not stats or not stats.entry_count:
+        return None
+
+    recent = (await db.scalars(
+        select(MoodEntry.score)
+        .where(MoodEntry.user_id == user_id)
+        .order_by(MoodEntry.created_at.desc(), MoodEntry.id.desc())
+        .limit(7)
+    )).all()
+    days = (await db.scalars(
+        select(MoodDailyRollup)
+        .where(MoodDailyRollup.user_id == user_id)
+        .order_by(MoodDailyRollup.day.desc())
+        .limit(7)
+    )).all()
+
+    return {
+        "entry_count": stats.entry_count,
+        "average_mood": stats.score_sum / stats.entry_count,
+        "last_7_days": list(reversed(recent)),
+        "daily": [
+            {
+                "day": d.day.isoformat(),
+                "entry_count": d.entry_count,
+                "average_mood": d.score_sum / d.entry_count,
+                "min": d.score_min,
+                "max": d.score_max
+            }
+            for d in reversed(days)
+        ]
+    }
+
+
+def _day_expr(dialect_name):
+    if dialect_name == "postgresql":
+        return func.date_trunc("day", MoodEntry.created_at).cast(MoodDailyRollup.day.type)
+    return func.date(MoodEntry.created_at)
+
+
+def backfill(session):
+    """Rebuild both rollup tables from mood_entries in one transaction."""
+    dialect_name = session.get_bind().dialect.name
+    day = _day_expr(dialect_name)
+
+    session.execute(delete(MoodDailyRollup))
+    session.execute(delete(MoodUserStats))
+    session.execute(insert(MoodDailyRollup).from_select(
+        ["user_id", "day", "entry_count", "score_sum", "score_min", "score_max"],
+        select(
+            MoodEntry.user_id,
+            day,
+            func.count(MoodEntry.id),
+            func.sum(MoodEntry.score),
+            func.min(MoodEntry.score),
+            func.max(MoodEntry.score),
+        ).where(MoodEntry.user_id.is_not(None)).group_by(MoodEntry.user_id, day),
+    ))
+    session.execute(insert(MoodUserStats).from_select(
+        ["user_id", "entry_count", "score_sum", "last_entry_at"],
+        select(
+            MoodEntry.user_id,
+            func.count(MoodEntry.id),
+            func.sum(MoodEntry.score),
+            func.max(MoodEntry.created_at),
+        ).where(MoodEntry.user_id.is_not(None)).group_by(MoodEntry.user_id),
+    ))
+    session.commit()
+
+
+if __name__ == "__main__":
+    # python -m mentalhealth_app.business.rollups
+    from mentalhealth_app.data.database import Base, SessionLocal, engine
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as session:
+        print("Rebuilding mood rollups...")
+        backfill(session)
+        users = session.scalar(select(func.count()).select_from(MoodUserStats))
+        print(f"Rollups rebuilt for {users} users.")
@@ -0,0 +1,42 @@
+# schemas.py
+from datetime import datetime, timezone
+from typing import Annotated, Literal, Optional, Union
+
+from pydantic import BaseModel, Field, field_validator
+
+MAX_BATCH_SIZE = 5000
+
+
+class BatchItemBase(BaseModel):
+    # Client-generated key; re-sending an item with the same key is a no-op
+    idempotency_key: str = Field(..., min_length=1, max_length=64)
+    # When the entry was made on the client; defaults to the time of upload
+    created_at: Optional[datetime] = None
+
+    @field_validator("created_at")
+    @classmethod
+    def to_naive_utc(cls, value):
+        # Entries are stored as naive UTC, matching datetime.utcnow() elsewhere
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+
+class MoodItem(BatchItemBase):
+    type: Literal["mood"]
+    score: int = Field(..., ge=1, le=10)
+    notes: Optional[str] = None
+
+
+class ActivityItem(BatchItemBase):
+    type: Literal["activity"]
+    activity: str = Field(..., min_length=1)
+    duration: int = Field(..., ge=0)
+
+
+class JournalItem(BatchItemBase):
+    type: Literal["journal"]
+    entry: str = Field(..., min_length=1)
+
+
+BatchItem = Annotated[Union[MoodItem, ActivityItem, JournalItem], Field(discriminator="type")]
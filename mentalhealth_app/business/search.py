@@ -0,0 +1,146 @@
+# search.py
+# Journal full-text search. On SQLite the index is an FTS5 external-content
+# table over journal_entries, kept in sync by triggers so every write path
+# (/journal, /batch, imports) is covered. user_id is indexed alongside the
+# text and part of every MATCH, so a search only visits the user's own rows.
+# PostgreSQL uses a GIN index on to_tsvector(entry) instead.
+import base64
+import re
+
+from fastapi import HTTPException, status
+from sqlalchemy import DateTime, Float, Integer, String, text
+
+SNIPPET_TOKENS = 12
+
+_SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS journal_fts USING fts5(
+        entry, user_id, content='journal_entries', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS journal_fts_ai AFTER INSERT ON journal_entries BEGIN
+        INSERT INTO journal_fts(rowid, entry, user_id) VALUES (new.id, new.entry, new.user_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS journal_fts_ad AFTER DELETE ON journal_entries BEGIN
+        INSERT INTO journal_fts(journal_fts, rowid, entry, user_id) VALUES ('delete', old.id, old.entry, old.user_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS journal_fts_au AFTER UPDATE OF entry, user_id ON journal_entries BEGIN
+        INSERT INTO journal_fts(journal_fts, rowid, entry, user_id) VALUES ('delete', old.id, old.entry, old.user_id);
+        INSERT INTO journal_fts(rowid, entry, user_id) VALUES (new.id, new.entry, new.user_id);
+    END""",
+]
+
+_SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS journal_fts_ai",
+    "DROP TRIGGER IF EXISTS journal_fts_ad",
+    "DROP TRIGGER IF EXISTS journal_fts_au",
+    "DROP TABLE IF EXISTS journal_fts",
+]
+
+_POSTGRES_DDL = [
+    """CREATE INDEX IF NOT EXISTS ix_journal_entries_fts
+        ON journal_entries USING GIN (to_tsvector('english', coalesce(entry, '')))""",
+]
+
+_SQLITE_SEARCH = text("""
+    SELECT j.id, j.entry, j.created_at,
+           snippet(journal_fts, 0, '[', ']', '...', :tokens) AS snippet,
+           bm25(journal_fts, 1.0, 0.0) AS rank
+    FROM journal_fts
+    JOIN journal_entries AS j ON j.id = journal_fts.rowid
+    WHERE journal_fts MATCH :query AND j.user_id = :user_id
+    ORDER BY rank, j.id DESC
+    LIMIT :limit OFFSET :offset
+""").columns(id=Integer, entry=String, created_at=DateTime, snippet=String, rank=Float)
+
+_POSTGRES_SEARCH = text("""
+    SELECT j.id, j.entry, j.created_at,
+           ts_headline('english', j.entry, q, 'StartSel=[, StopSel=], MaxWords=' || :tokens) AS snippet,
+           -ts_rank(to_tsvector('english', coalesce(j.entry, '')), q) AS rank
+    FROM journal_entries AS j, plainto_tsquery('english', :query) AS q
+    WHERE to_tsvector('english', coalesce(j.entry, '')) @@ q AND j.user_id = :user_id
+    ORDER BY rank, j.id DESC
+    LIMIT :limit OFFSET :offset
+""").columns(id=Integer, entry=String, created_at=DateTime, snippet=String, rank=Float)
+
+
+def create_index(connection):
+    ddl = _POSTGRES_DDL if connection.dialect.name == "postgresql" else _SQLITE_DDL
+    for statement in ddl:
+        connection.execute(text(statement))
+
+
+def drop_index(connection):
+    """Drop the SQLite FTS table and its triggers, so create_index can change their columns."""
+    for statement in _SQLITE_DROP:
+        connection.execute(text(statement))
+
+
+def rebuild_index(connection):
+    """Re-index every existing journal entry."""
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("REINDEX INDEX ix_journal_entries_fts"))
+    else:
+        connection.execute(text("INSERT INTO journal_fts(journal_fts) VALUES ('rebuild')"))
+
+
+def fts_query(raw: str) -> str:
+    # Quote every term so user input can never be parsed as FTS5 syntax;
+    # terms are AND-ed and the last one matches as a prefix while typing
+    terms = re.findall(r"\w+", raw)
+    if not terms:
+        return ""
+    quoted = ['"' + term.replace('"', '""') + '"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def user_fts_query(user_id: int, raw: str) -> str:
+    # The user_id column filter makes FTS5 intersect with that user's rows
+    # before ranking, instead of ranking every user's matches
+    terms = fts_query(raw)
+    return f'user_id : "{int(user_id)}" AND entry : ({terms})' if terms else ""
+
+
+def encode_offset(offset: int) -> str:
+    return base64.urlsafe_b64encode(f"o:{offset}".encode()).rstrip(b"=").decode("ascii")
+
+
+def decode_offset(cursor: str) -> int:
+    # Ranked results have no stable key order, so search cursors carry an offset
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        prefix, offset = raw.split(":", 1)
+        if prefix != "o" or int(offset) < 0:
+            raise ValueError(raw)
+        return int(offset)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+async def search_journal(db, user_id: int, raw_query: str, limit: int, cursor: str = None):
+    """Return (rows, next_cursor) of ranked journal matches for one user."""
+    offset = decode_offset(cursor) if cursor else 0
+    if db.bind.dialect.name == "postgresql":
+        statement, query = _POSTGRES_SEARCH, raw_query
+    else:
+        statement, query = _SQLITE_SEARCH, user_fts_query(user_id, raw_query)
+    if not query:
+        return [], None
+
+    rows = (await db.execute(statement, {
+        "query": query, "user_id": user_id, "tokens": SNIPPET_TOKENS,
+        "limit": limit + 1, "offset": offset,
+    })).all()
+    if len(rows) <= limit:
+        return rows, None
+    return rows[:limit], encode_offset(offset + limit)
+
+
+if __name__ == "__main__":
+    # python -m mentalhealth_app.business.search
+    from mentalhealth_app.data.database import engine
+
+    with engine.begin() as connection:
+        print("Rebuilding journal search index...")
+        create_index(connection)
+        rebuild_index(connection)
+    print("Journal search index rebuilt.")
@@ -0,0 +1,44 @@
+# serializers.py
+# Plain-dict views of entry rows, shared by every endpoint that returns entries.
+# They work on ORM objects and on column-only result rows alike. created_at is
+# left as a datetime; ORJSONResponse encodes it natively.
+
+FIELDS = {
+    "mood_entries": ("id", "score", "notes", "client_key", "created_at"),
+    "activity_entries": ("id", "activity", "duration", "client_key", "created_at"),
+    "journal_entries": ("id", "entry", "client_key", "created_at"),
+}
+
+
+def entry_columns(model):
+    """The columns the *_to_dict functions read, for column-only selects."""
+    return [getattr(model, name) for name in FIELDS[model.__tablename__]]
+
+
+def mood_to_dict(entry):
+    return {
+        "id": entry.id,
+        "score": entry.score,
+        "notes": entry.notes,
+        "client_key": entry.client_key,
+        "created_at": entry.created_at
+    }
+
+
+def activity_to_dict(entry):
+    return {
+        "id": entry.id,
+        "activity": entry.activity,
+        "duration": entry.duration,
+        "client_key": entry.client_key,
+        "created_at": entry.created_at
+    }
+
+
+def journal_to_dict(entry):
+    return {
+        "id": entry.id,
+        "entry": entry.entry,
+        "client_key": entry.client_key,
+        "created_at": entry.created_at
+    }
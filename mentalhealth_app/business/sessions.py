@@ -0,0 +1,170 @@
+# sessions.py
+import base64
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from dataclasses import dataclass
+
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from mentalhealth_app.data.database import get_async_db
+from mentalhealth_app.settings import settings
+from .cache import LRUCache
+from .models import User
+
+# Tokens are signed with this key; set MENTALHEALTH_SECRET_KEY so tokens survive restarts
+SECRET_KEY = settings.secret_key.encode()
+TOKEN_TTL_SECONDS = settings.token_ttl_seconds
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    id: int
+    username: str
+    email: str
+    password_fingerprint: str
+
+
+@dataclass(frozen=True)
+class SessionToken:
+    user_id: int
+    session_id: str
+    expires_at: int
+    password_fingerprint: str
+
+
+# user_id -> CachedUser, so validating a token does not hit the users table.
+# Like the revocations below it lives in this process only: with several
+# workers, tokens from before a password change stay valid on the others
+# until their cached record expires, and a logout only on the worker that
+# handled it until the token itself expires.
+user_cache = LRUCache(maxsize=10_000, ttl=settings.user_cache_ttl_seconds)
+
+# session_id -> expiry of tokens revoked by /logout
+_revoked_sessions = {}
+_revoked_lock = threading.Lock()
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(payload: str) -> str:
+    return _b64encode(hmac.new(SECRET_KEY, payload.encode("ascii"), hashlib.sha256).digest())
+
+
+def password_fingerprint(user: User) -> str:
+    # Changes whenever the password does, which invalidates all older tokens;
+    # rehashing the same password on login leaves it alone
+    changed_at = user.password_changed_at.isoformat() if user.password_changed_at else ""
+    return _sign(f"{user.id}:{changed_at}")[:16]
+
+
+def cache_user(user: User) -> CachedUser:
+    cached = CachedUser(
+        id=user.id,
+        username=user.username,
+        email=user.email,
+        password_fingerprint=password_fingerprint(user),
+    )
+    user_cache.set(user.id, cached)
+    return cached
+
+
+def invalidate_user(user_id: int):
+    user_cache.pop(user_id)
+
+
+def issue_token(user: User) -> SessionToken:
+    cached = cache_user(user)
+    token = SessionToken(
+        user_id=user.id,
+        session_id=secrets.token_hex(8),
+        expires_at=int(time.time()) + TOKEN_TTL_SECONDS,
+        password_fingerprint=cached.password_fingerprint,
+    )
+    return token
+
+
+def encode_token(token: SessionToken) -> str:
+    payload = _b64encode(
+        f"{token.user_id}:{token.session_id}:{token.expires_at}:{token.password_fingerprint}".encode("ascii")
+    )
+    return f"{payload}.{_sign(payload)}"
+
+
+def decode_token(raw: str):
+    try:
+        payload, signature = raw.split(".", 1)
+        # Bytes: compare_digest raises TypeError for non-ASCII str
+        if not hmac.compare_digest(signature.encode(), _sign(payload).encode()):
+            return None
+        user_id, session_id, expires_at, fingerprint = _b64decode(payload).decode("ascii").split(":")
+        token = SessionToken(int(user_id), session_id, int(expires_at), fingerprint)
+    except (ValueError, UnicodeError):
+        return None
+    if token.expires_at <= time.time():
+        return None
+    with _revoked_lock:
+        if token.session_id in _revoked_sessions:
+            return None
+    return token
+
+
+def revoke_token(token: SessionToken):
+    now = time.time()
+    with _revoked_lock:
+        # Drop revocations for tokens that have expired anyway
+        for session_id in [s for s, exp in _revoked_sessions.items() if exp <= now]:
+            del _revoked_sessions[session_id]
+        _revoked_sessions[token.session_id] = token.expires_at
+
+
+async def load_user(db: AsyncSession, user_id: int, refresh: bool = False):
+    cached = None if refresh else user_cache.get(user_id)
+    if cached is not None:
+        return cached
+    user = await db.get(User, user_id)
+    if user is None:
+        return None
+    return cache_user(user)
+
+
+async def get_current_token(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+) -> SessionToken:
+    token = decode_token(credentials.credentials) if credentials else None
+    if token is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return token
+
+
+async def get_current_user(
+    token: SessionToken = Depends(get_current_token),
+    db: AsyncSession = Depends(get_async_db),
+) -> CachedUser:
+    user = await load_user(db, token.user_id)
+    if user is not None and user.password_fingerprint != token.password_fingerprint:
+        # The cached record may predate a password change made on another worker
+        user = await load_user(db, token.user_id, refresh=True)
+    if user is None or user.password_fingerprint != token.password_fingerprint:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
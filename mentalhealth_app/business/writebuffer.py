@@ -0,0 +1,152 @@
+# writebuffer.py
+# Group commit for the single-entry endpoints. Instead of one transaction
+# (and one fsync) per request, entries are queued and a background task
+# writes whatever has accumulated - up to max_batch entries, or after
+# max_delay seconds - as one bulk INSERT per entry type and a single commit.
+#
+# In durable mode a request is answered once its batch has committed; in
+# relaxed mode it is answered as soon as the entry is queued, and entries
+# still queued are lost if the process dies before the next flush.
+#
+# When a batch fails, its entries are retried one per transaction so one bad
+# row only fails itself. Each failure goes to the waiting request (durable)
+# or, when nobody is waiting (relaxed), to the on_failed callback.
+import asyncio
+import contextvars
+import logging
+from collections import defaultdict
+
+from sqlalchemy import insert
+
+from mentalhealth_app.data.database import AsyncSessionLocal
+
+from . import rollups
+from .ingest import MODELS
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBuffer:
+    def __init__(self, max_batch=500, max_delay=0.005, durable=True, max_queue=10_000, on_flush=None,
+                 on_failed=None):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.durable = durable
+        self.max_queue = max_queue
+        # Awaited with {user_id: {kind: [rows]}} after each commit
+        self.on_flush = on_flush
+        # Awaited with {user_id: [(kind, values, exception)]} for failed entries no request waits on
+        self.on_failed = on_failed
+        self._queue = None
+        self._task = None
+
+    def _start(self):
+        # Created lazily so the queue and task belong to the serving event loop
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            # Started from an empty context: the task would otherwise inherit
+            # the context variables (e.g. request metrics) of whichever request
+            # happened to start it
+            self._task = contextvars.Context().run(asyncio.create_task, self._run(), name="write-buffer")
+
+    async def submit(self, kind: str, user_id: int, values: dict):
+        """Queue one entry; returns its stored row in durable mode, None in relaxed mode."""
+        self._start()
+        future = asyncio.get_running_loop().create_future() if self.durable else None
+        # A full queue makes callers wait, which pushes back on clients
+        await self._queue.put((kind, user_id, values, future))
+        if future is not None:
+            return await future
+        return None
+
+    async def close(self):
+        """Flush everything queued and stop the background task."""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            first = await self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = loop.time() + self.max_delay
+            stop = False
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                try:
+                    item = self._queue.get_nowait() if timeout <= 0 else await asyncio.wait_for(self._queue.get(), timeout)
+                except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+            if stop:
+                return
+
+    async def _flush(self, batch):
+        try:
+            written = await self._write(batch)
+        except Exception:
+            logger.warning("Write buffer flush of %d entries failed; writing them one by one", len(batch), exc_info=True)
+            written = [await self._write_one(item) for item in batch]
+
+        by_user = defaultdict(lambda: defaultdict(list))
+        failed = defaultdict(list)
+        for (kind, user_id, values, future), row in zip(batch, written):
+            if isinstance(row, Exception):
+                if future is not None:
+                    if not future.done():
+                        future.set_exception(row)
+                else:
+                    failed[user_id].append((kind, values, row))
+                continue
+            by_user[user_id][kind].append(row)
+            if future is not None and not future.done():
+                future.set_result(row)
+        for callback, results in ((self.on_flush, by_user), (self.on_failed, failed)):
+            if callback and results:
+                try:
+                    await callback(results)
+                except Exception:
+                    logger.exception("Write buffer %s callback failed", callback.__name__)
+
+    async def _write_one(self, item):
+        """The stored row, or the exception that kept it from being stored."""
+        try:
+            return (await self._write([item]))[0]
+        except Exception as exc:
+            logger.error("Write buffer entry of user %s failed: %r", item[1], exc)
+            return exc
+
+    async def _write(self, batch):
+        """Insert the batch in one transaction; returns rows in batch order."""
+        async with AsyncSessionLocal() as db:
+            written = [None] * len(batch)
+            for kind, model in MODELS.items():
+                positions = [i for i, (entry_kind, _, _, _) in enumerate(batch) if entry_kind == kind]
+                if not positions:
+                    continue
+                rows = [{"user_id": batch[i][1], **batch[i][2]} for i in positions]
+                inserted = (await db.scalars(
+                    insert(model).returning(model, sort_by_parameter_order=True), rows
+                )).all()
+                for i, row in zip(positions, inserted):
+                    written[i] = row
+
+            moods = defaultdict(list)
+            for (kind, user_id, _, _), row in zip(batch, written):
+                if kind == "mood":
+                    moods[user_id].append((row.score, row.created_at))
+            for user_id, entries in moods.items():
+                for stmt in rollups.mood_rollup_statements(db.bind.dialect.name, user_id, entries):
+                    await db.execute(stmt)
+
+            await db.commit()
+            return written
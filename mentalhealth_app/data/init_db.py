@@ -1,7 +1,12 @@
 # init_db.py
 from data.database import engine
+from data.migrations import migrate
 from business.models import Base  # Import models to register them with SQLAlchemy
 
 print("Creating database tables...")
 Base.metadata.create_all(bind=engine)
-print("Tables created successfully!")
\ No newline at end of file
+print("Tables created successfully!")
+
+print("Applying migrations...")
+migrate(engine, verbose=True)
+print("Database is up to date!")
\ No newline at end of file
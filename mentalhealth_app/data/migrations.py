@@ -0,0 +1,235 @@
+# migrations.py
+# Versioned schema migrations. Base.metadata.create_all only creates missing
+# tables, so anything that changes an existing table (new indexes, columns,
+# backfills) is registered here and applied once per database, in order.
+from datetime import datetime
+
+from sqlalchemy import (
+    Column, DateTime, Integer, MetaData, String, Table, bindparam, func, inspect, select, text, tuple_,
+)
+from sqlalchemy.orm import Session
+
+MIGRATIONS = []  # (version, description, fn(connection)), in version order
+_BACKFILL_CHUNK = 1000
+
+_meta = MetaData()
+schema_migrations = Table(
+    "schema_migrations", _meta,
+    Column("version", Integer, primary_key=True),
+    Column("description", String),
+    Column("applied_at", DateTime),
+)
+
+
+def migration(version: int, description: str):
+    def register(fn):
+        assert not MIGRATIONS or MIGRATIONS[-1][0] < version, "migrations must be added in order"
+        MIGRATIONS.append((version, description, fn))
+        return fn
+    return register
+
+
+def current_version(connection) -> int:
+    schema_migrations.create(connection, checkfirst=True)
+    return connection.scalar(select(func.max(schema_migrations.c.version))) or 0
+
+
+def migrate(engine, verbose=False):
+    """Apply all pending migrations, each in its own transaction."""
+    with engine.begin() as connection:
+        version = current_version(connection)
+
+    applied = []
+    for number, description, fn in MIGRATIONS:
+        if number <= version:
+            continue
+        with engine.begin() as connection:
+            fn(connection)
+            connection.execute(schema_migrations.insert().values(
+                version=number, description=description, applied_at=datetime.utcnow()
+            ))
+        applied.append(number)
+        if verbose:
+            print(f"Applied migration {number}: {description}")
+    return applied
+
+
+# Migration 1's indexes as first shipped. The models' definitions have since
+# gained columns that only exist after later migrations (activity_key comes
+# with 5, which rebuilds that index), so they must not be used here
+_HISTORY_INDEXES = (
+    ("ix_mood_entries_user_created", "mood_entries", ("user_id", "created_at", "id", "score")),
+    ("ix_activity_entries_user_created", "activity_entries", ("user_id", "created_at", "id")),
+    ("ix_journal_entries_user_created", "journal_entries", ("user_id", "created_at", "id")),
+)
+
+
+@migration(1, "composite (user_id, created_at) indexes on entry tables")
+def _add_history_indexes(connection):
+    for name, table, columns in _HISTORY_INDEXES:
+        connection.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"))
+
+
+@migration(2, "backfill mood rollup tables")
+def _backfill_mood_rollups(connection):
+    from mentalhealth_app.business import rollups
+    from mentalhealth_app.business.models import MoodDailyRollup, MoodUserStats
+
+    MoodUserStats.__table__.create(connection, checkfirst=True)
+    MoodDailyRollup.__table__.create(connection, checkfirst=True)
+    with Session(bind=connection) as session:
+        rollups.backfill(session)
+
+
+@migration(3, "client_key idempotency column on entry tables")
+def _add_client_keys(connection):
+    from mentalhealth_app.business.models import ActivityEntry, JournalEntry, MoodEntry
+
+    for model in (MoodEntry, ActivityEntry, JournalEntry):
+        table = model.__table__
+        columns = {c["name"] for c in inspect(connection).get_columns(table.name)}
+        if "client_key" not in columns:
+            connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN client_key VARCHAR"))
+        for index in table.indexes:
+            if index.name.endswith("_client_key"):
+                index.create(connection, checkfirst=True)
+
+
+@migration(4, "journal full-text search index")
+def _add_journal_search(connection):
+    from mentalhealth_app.business import search
+
+    search.create_index(connection)
+    search.rebuild_index(connection)
+
+
+@migration(5, "normalized activity_key column and index for activity totals")
+def _add_activity_keys(connection):
+    from mentalhealth_app.business.activities import normalize_activity
+    from mentalhealth_app.business.models import ActivityEntry
+
+    table = ActivityEntry.__table__
+    columns = {c["name"] for c in inspect(connection).get_columns(table.name)}
+    if "activity_key" not in columns:
+        connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN activity_key VARCHAR"))
+    # Backfill in id order, one executemany per chunk
+    update = table.update().where(table.c.id == bindparam("row_id")).values(activity_key=bindparam("key"))
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            select(table.c.id, table.c.activity)
+            .where(table.c.id > last_id)
+            .order_by(table.c.id)
+            .limit(_BACKFILL_CHUNK)
+        ).all()
+        if not rows:
+            break
+        connection.execute(update, [{"row_id": row.id, "key": normalize_activity(row.activity)} for row in rows])
+        last_id = rows[-1].id
+    # The history index gains activity_key and duration, so it is rebuilt
+    connection.execute(text("DROP INDEX IF EXISTS ix_activity_entries_user_created"))
+    for index in table.indexes:
+        if index.name.endswith(("_user_created", "_user_key_created")):
+            index.create(connection, checkfirst=True)
+
+
+@migration(6, "password_changed_at column on users")
+def _add_password_changed_at(connection):
+    from mentalhealth_app.business.models import User
+
+    table = User.__table__
+    columns = {c["name"] for c in inspect(connection).get_columns(table.name)}
+    if "password_changed_at" not in columns:
+        # DATETIME on SQLite, TIMESTAMP WITHOUT TIME ZONE on PostgreSQL
+        column_type = table.c.password_changed_at.type.compile(dialect=connection.dialect)
+        connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN password_changed_at {column_type}"))
+    # Sessions issued before this are fingerprinted by the old hash and end here once
+    connection.execute(
+        table.update()
+        .where(table.c.password_changed_at.is_(None))
+        .values(password_changed_at=func.coalesce(table.c.created_at, datetime.utcnow()))
+    )
+
+
+@migration(7, "user_id in the journal search index")
+def _scope_journal_search(connection):
+    from mentalhealth_app.business import search
+
+    # PostgreSQL's query filters through the user_id index and needs no change
+    if connection.dialect.name == "postgresql":
+        return
+    search.drop_index(connection)
+    search.create_index(connection)
+    search.rebuild_index(connection)
+
+
+def _plan(connection, statement) -> str:
+    compiled = statement.compile(connection, compile_kwargs={"literal_binds": True})
+    rows = connection.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+    return "\n".join(row[-1] for row in rows)
+
+
+def check_query_plans(engine):
+    """Assert via EXPLAIN QUERY PLAN that hot queries use their indexes (SQLite only)."""
+    from mentalhealth_app.business import activities
+    from mentalhealth_app.business.models import (
+        ActivityEntry, JournalEntry, MoodDailyRollup, MoodEntry, MoodUserStats,
+    )
+
+    checks = [
+        ("mood history", "ix_mood_entries_user_created",
+         select(MoodEntry).where(MoodEntry.user_id == 1)
+         .order_by(MoodEntry.created_at.desc(), MoodEntry.id.desc()).limit(10)),
+        ("mood history next page", "ix_mood_entries_user_created",
+         select(MoodEntry).where(MoodEntry.user_id == 1)
+         .where(tuple_(MoodEntry.created_at, MoodEntry.id) < tuple_(datetime(2024, 1, 1), 100))
+         .order_by(MoodEntry.created_at.desc(), MoodEntry.id.desc()).limit(10)),
+        ("activity history", "ix_activity_entries_user_created",
+         select(ActivityEntry).where(ActivityEntry.user_id == 1)
+         .order_by(ActivityEntry.created_at.desc(), ActivityEntry.id.desc()).limit(20)),
+        ("journal history", "ix_journal_entries_user_created",
+         select(JournalEntry).where(JournalEntry.user_id == 1)
+         .order_by(JournalEntry.created_at.desc(), JournalEntry.id.desc()).limit(20)),
+        ("insights recent scores", "COVERING INDEX ix_mood_entries_user_created",
+         select(MoodEntry.score).where(MoodEntry.user_id == 1)
+         .order_by(MoodEntry.created_at.desc(), MoodEntry.id.desc()).limit(7)),
+        ("insights daily rollups", "sqlite_autoindex_mood_daily_rollups_1",
+         select(MoodDailyRollup).where(MoodDailyRollup.user_id == 1)
+         .order_by(MoodDailyRollup.day.desc()).limit(7)),
+        ("insights totals", "PRIMARY KEY",
+         select(MoodUserStats).where(MoodUserStats.user_id == 1)),
+        ("mood chart points", "COVERING INDEX ix_mood_entries_user_created",
+         select(MoodEntry.created_at, MoodEntry.score).where(MoodEntry.user_id == 1)
+         .order_by(MoodEntry.created_at)),
+    ]
+
+    # GROUP BY over date buckets always sorts; only index use is checked
+    grouped = [
+        ("activity totals", "COVERING INDEX ix_activity_entries_user_created",
+         activities.totals_query("sqlite", 1, "week", datetime(2024, 1, 1))),
+        ("activity totals for one activity", "COVERING INDEX ix_activity_entries_user_key_created",
+         activities.totals_query("sqlite", 1, "day", datetime(2024, 1, 1), "running")),
+    ]
+
+    with engine.connect() as connection:
+        for name, expected, statement in checks + grouped:
+            plan = _plan(connection, statement)
+            assert expected in plan, f"{name}: expected {expected!r} in plan:\n{plan}"
+            if (name, expected, statement) in checks:
+                assert "TEMP B-TREE" not in plan, f"{name}: query needs a sort:\n{plan}"
+            print(f"ok  {name}: {plan.splitlines()[0]}")
+
+
+if __name__ == "__main__":
+    # python -m mentalhealth_app.data.migrations [--check]
+    import sys
+
+    from mentalhealth_app.data.database import Base, engine
+    import mentalhealth_app.business.models  # noqa: F401 - registers the tables
+
+    Base.metadata.create_all(bind=engine)
+    applied = migrate(engine, verbose=True)
+    if not applied:
+        print("Database schema is up to date.")
+    if "--check" in sys.argv:
+        check_query_plans(engine)
@@ -0,0 +1,164 @@
+# api_client.py
+# HTTP client for the backend API. One keep-alive session is shared by every
+# call, and requests run on a small thread pool so Flet handlers never block
+# waiting on the network.
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_BASE_URL = "http://localhost:8000"
+# (connect, read) seconds
+DEFAULT_TIMEOUT = (3.05, 15)
+# The server sends a keep-alive every 15 s, so silence this long means the stream is dead
+EVENTS_READ_TIMEOUT = 40
+
+
+class ApiError(Exception):
+    def __init__(self, status_code, detail):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class ApiClient:
+    def __init__(self, base_url=None, timeout=DEFAULT_TIMEOUT, retries=3, pool_size=8, workers=4):
+        self.base_url = (base_url or os.environ.get("MENTALHEALTH_API_URL", DEFAULT_BASE_URL)).rstrip("/")
+        self.timeout = timeout
+        self.token = None
+
+        # Retry connection failures and gateway errors; only idempotent methods
+        # are retried on a response, so a slow POST is never written twice
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.3,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({"GET", "HEAD", "OPTIONS"}),
+        )
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api")
+
+    # Plumbing
+
+    def request(self, method, path, **kwargs):
+        headers = kwargs.pop("headers", {})
+        if self.token:
+            headers.setdefault("Authorization", f"Bearer {self.token}")
+        response = self.session.request(
+            method, self.base_url + path, headers=headers, timeout=self.timeout, **kwargs
+        )
+        if response.status_code >= 400:
+            try:
+                detail = response.json().get("detail", response.reason)
+            except ValueError:
+                detail = response.reason
+            raise ApiError(response.status_code, detail if isinstance(detail, str) else str(detail))
+        if response.status_code == 204 or not response.content:
+            return None
+        return response.json()
+
+    def run(self, fn, *args, on_success=None, on_error=None):
+        """Call fn(*args) on the worker pool and hand the outcome to a callback.
+
+        Callbacks run on the worker thread; Flet controls may be updated from there.
+        """
+        def task():
+            try:
+                result = fn(*args)
+            except Exception as exc:
+                if on_error:
+                    on_error(exc)
+                return None
+            if on_success:
+                on_success(result)
+            return result
+        return self.executor.submit(task)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+    # Endpoints
+
+    def register(self, username, password, email=None):
+        return self.request("POST", "/register", data={"username": username, "password": password, "email": email})
+
+    def login(self, username, password):
+        data = self.request("POST", "/login", data={"username": username, "password": password})
+        self.token = data["access_token"]
+        return data
+
+    def logout(self):
+        """Forget the session now and revoke it on the server in the background."""
+        token, self.token = self.token, None
+        if token:
+            revoke = partial(self.request, "POST", "/logout", headers={"Authorization": f"Bearer {token}"})
+            return self.run(revoke)
+        return None
+
+    def dashboard(self):
+        return self.request("GET", "/dashboard")
+
+    def changes(self, since):
+        return self.request("GET", "/changes", params={"since": since})
+
+    def history(self, kind, cursor=None, limit=None):
+        params = {}
+        if cursor:
+            params["cursor"] = cursor
+        if limit:
+            params["limit"] = limit
+        return self.request("GET", f"/{kind}_history", params=params)
+
+    def log_mood(self, score, notes=None):
+        return self.request("POST", "/mood", data={"score": score, "notes": notes})
+
+    def log_activity(self, activity, duration):
+        return self.request("POST", "/activity", data={"activity": activity, "duration": duration})
+
+    def log_journal(self, entry):
+        return self.request("POST", "/journal", data={"entry": entry})
+
+    def events(self):
+        """Yield (event, data) pairs pushed by GET /events until the stream drops.
+
+        An ("open", {}) pair is yielded once the stream is connected and a
+        ("ping", {}) pair for every keep-alive.
+        """
+        headers = {"Accept": "text/event-stream"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        with self.session.get(
+            self.base_url + "/events", headers=headers, stream=True,
+            timeout=(self.timeout[0], EVENTS_READ_TIMEOUT),
+        ) as response:
+            if response.status_code >= 400:
+                raise ApiError(response.status_code, response.reason)
+            yield "open", {}
+            event, data = "message", []
+            for line in response.iter_lines(decode_unicode=True):
+                if line:
+                    field, _, value = line.partition(":")
+                    if field == "event":
+                        event = value.strip()
+                    elif field == "data":
+                        data.append(value.lstrip())
+                    continue
+                # A blank line ends an event; comment-only blocks are keep-alives
+                if data:
+                    yield event, json.loads("\n".join(data))
+                else:
+                    yield "ping", {}
+                event, data = "message", []
+
+    def batch(self, items):
+        # Safe to resend: the server skips items whose idempotency_key it already has
+        return self.request("POST", "/batch", json=items)
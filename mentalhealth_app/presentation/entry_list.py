@@ -0,0 +1,99 @@
+# entry_list.py
+# Keeps a Flet ListView in step with the local store without rebuilding it.
+# Tiles are keyed by the store's local id: a refresh asks the store only for
+# entries written since the previous one, inserts tiles for new entries and
+# swaps tiles whose entry changed (e.g. a pending entry that has synced).
+# Older entries are appended a page at a time as the user scrolls.
+import threading
+
+PAGE_SIZE = 50
+
+
+class EntryList:
+    def __init__(self, view, kind, make_tile, page_size=PAGE_SIZE):
+        self.view = view
+        self.kind = kind
+        self.make_tile = make_tile
+        self.page_size = page_size
+        # Refreshes come from the sync thread, paging from the UI thread
+        self._lock = threading.RLock()
+        self.fetching = False
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.view.controls.clear()
+            self._keys = []    # (created_at, local_id) of each tile, newest first
+            self._tiles = {}   # local_id -> tile
+            self._seq = 0
+            # Every stored entry of this kind is shown; anything the store
+            # gains later belongs in the list, wherever it sorts
+            self.at_end = False
+            self.server_done = False
+
+    def _update(self):
+        if self.view.page is not None:
+            self.view.update()
+
+    def load(self, store):
+        """Show the newest page from the store."""
+        with self._lock:
+            self.reset()
+            self._seq = store.max_seq()
+            self._append(store.entries(self.kind, limit=self.page_size))
+        self._update()
+
+    def load_more(self, store):
+        """Append the next page of older entries; returns how many were added."""
+        with self._lock:
+            before = self._keys[-1] if self._keys else None
+            added = self._append(store.entries(self.kind, limit=self.page_size, before=before))
+        if added:
+            self._update()
+        return added
+
+    def refresh(self, store):
+        """Apply entries the store has gained or changed since the last call."""
+        changed = False
+        with self._lock:
+            for entry in store.changed(self.kind, self._seq):
+                self._seq = max(self._seq, entry["seq"])
+                changed |= self._apply(entry)
+        if changed:
+            self._update()
+
+    def _append(self, entries):
+        added = 0
+        for entry in entries:
+            if entry["local_id"] in self._tiles:
+                continue
+            tile = self.make_tile(entry)
+            self._tiles[entry["local_id"]] = tile
+            self._keys.append((entry["created_at"], entry["local_id"]))
+            self.view.controls.append(tile)
+            added += 1
+        if len(entries) < self.page_size:
+            self.at_end = True
+        return added
+
+    def _apply(self, entry):
+        local_id = entry["local_id"]
+        tile = self._tiles.get(local_id)
+        if tile is not None:
+            replacement = self.make_tile(entry)
+            self.view.controls[self.view.controls.index(tile)] = replacement
+            self._tiles[local_id] = replacement
+            return True
+
+        key = (entry["created_at"], local_id)
+        if not self.at_end and (not self._keys or key < self._keys[-1]):
+            return False  # Below the loaded window; paging will reach it
+        # New entries are almost always the newest, so scan from the top
+        index = 0
+        while index < len(self._keys) and self._keys[index] > key:
+            index += 1
+        tile = self.make_tile(entry)
+        self._tiles[local_id] = tile
+        self._keys.insert(index, key)
+        self.view.controls.insert(index, tile)
+        return True
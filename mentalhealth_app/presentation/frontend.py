@@ -1,7 +1,10 @@
 import flet as ft
-import requests
 from datetime import datetime
 
+from api_client import ApiClient
+from entry_list import EntryList
+from local_store import LocalStore, PushListener, SyncWorker
+
 def main(page: ft.Page):
     # Light mode settings
     page.title = "Mental Health Tracker"
@@ -21,7 +24,25 @@ def main(page: ft.Page):
 
     # State variables
     current_user = ft.TextField(visible=False)
-    current_password = ft.TextField(visible=False)
+    # Pooled keep-alive client; calls run off the UI thread via api.run
+    api = ApiClient()
+    # On-disk mirror of the user's entries and its background sync thread,
+    # plus the /events listener that merges entries pushed by the server
+    sync_state = {"store": None, "worker": None, "listener": None}
+
+    def stop_sync():
+        for key in ("listener", "worker"):
+            if sync_state[key]:
+                sync_state[key].stop()
+        if sync_state["store"]:
+            sync_state["store"].close()
+        sync_state["store"] = sync_state["worker"] = sync_state["listener"] = None
+
+    def on_disconnect(e):
+        stop_sync()
+        api.close()
+
+    page.on_disconnect = on_disconnect
     
     # UI Components
     # Mood Tracking
@@ -69,21 +90,51 @@ def main(page: ft.Page):
         on_change=lambda e: change_tab(e.control.selected_index)
     )
 
-    # Content area
-    content_column = ft.Column(
+    # Content area: each tab is built once and shown or hidden by change_tab
+    mood_view = ft.Column(
         [
             ft.Text("How are you feeling today?", size=20),
             mood_slider,
             mood_notes,
             ft.ElevatedButton("Log Mood", on_click=lambda e: submit_mood(e)),
             ft.Divider(),
-            ft.Text("Recent Entries", size=16),
+            ft.Text("Recent Mood Entries", size=16),
             mood_history
         ],
         alignment="center",
         horizontal_alignment="center",
         expand=True
     )
+    activity_view = ft.Column(
+        [
+            ft.Text("Track Your Activities", size=20),
+            ft.Row([activity_input, activity_duration]),
+            ft.ElevatedButton("Add Activity", on_click=lambda e: add_activity(e)),
+            ft.Divider(),
+            ft.Text("Today's Activities", size=16),
+            activities_list
+        ],
+        alignment="center",
+        horizontal_alignment="center",
+        expand=True,
+        visible=False
+    )
+    journal_view = ft.Column(
+        [
+            ft.Text("Journal Entry", size=20),
+            journal_entry,
+            ft.ElevatedButton("Save Entry", on_click=lambda e: add_journal_entry(e)),
+            ft.Divider(),
+            ft.Text("Previous Entries", size=16),
+            journal_entries
+        ],
+        alignment="center",
+        horizontal_alignment="center",
+        expand=True,
+        visible=False
+    )
+    tab_views = [mood_view, activity_view, journal_view]
+    content_column = ft.Column(tab_views, expand=True)
 
     # Main layout
     main_content = ft.Row(
@@ -95,190 +146,143 @@ def main(page: ft.Page):
         expand=True
     )
 
-    def fetch_mood_history():
-        try:
-            response = requests.post(
-                "http://localhost:8000/mood_history",
-                data={
-                    "username": current_user.value,
-                    "password": current_password.value
-                },
-                headers={"Content-Type": "application/x-www-form-urlencoded"}
-            )
-            if response.status_code == 200:
-                mood_history.controls.clear()
-                for entry in response.json():
-                    mood_history.controls.append(
-                        ft.ListTile(
-                            title=ft.Text(f"Mood: {entry['score']}"),
-                            subtitle=ft.Text(f"Notes: {entry['notes'] or 'None'}"),
-                            trailing=ft.Text(datetime.fromisoformat(entry['created_at']).strftime("%H:%M"))
-                        )
-                    )
-                page.update()
-            else:
-                show_snackbar("Failed to fetch mood history")
-        except Exception as e:
-            show_snackbar(f"Error: {str(e)}")
+    def entry_time(entry, fmt):
+        # Entries saved offline are marked until the server has them
+        text = datetime.fromisoformat(entry["created_at"]).strftime(fmt)
+        return text + " (not synced)" if entry.get("pending") else text
+
+    def mood_tile(entry):
+        return ft.ListTile(
+            title=ft.Text(f"Mood: {entry['score']}"),
+            subtitle=ft.Text(f"Notes: {entry['notes'] or 'None'}"),
+            trailing=ft.Text(entry_time(entry, "%H:%M"))
+        )
+
+    def activity_tile(entry):
+        return ft.ListTile(
+            title=ft.Text(entry["activity"]),
+            subtitle=ft.Text(f"{entry['duration']} minutes"),
+            trailing=ft.Text(entry_time(entry, "%H:%M"))
+        )
+
+    def journal_tile(entry):
+        return ft.ListTile(
+            title=ft.Text(entry_time(entry, "%b %d, %H:%M")),
+            subtitle=ft.Text(entry["entry"])
+        )
+
+    # Lists are diffed against the local store, so refreshes only touch new tiles
+    lists = {
+        "mood": EntryList(mood_history, "mood", mood_tile),
+        "activity": EntryList(activities_list, "activity", activity_tile),
+        "journal": EntryList(journal_entries, "journal", journal_tile),
+    }
+
+    def refresh_lists():
+        store = sync_state["store"]
+        if store is None:
+            return
+        for entry_list in lists.values():
+            entry_list.refresh(store)
+
+    def load_older(kind):
+        store, worker = sync_state["store"], sync_state["worker"]
+        entry_list = lists[kind]
+        if store is None or entry_list.load_more(store) or not entry_list.at_end:
+            return
+        # Everything on disk is shown; fetch the next page of server history
+        if entry_list.fetching or entry_list.server_done:
+            return
+        entry_list.fetching = True
+
+        def fetched(added):
+            entry_list.fetching = False
+            entry_list.server_done = not added
+            entry_list.refresh(store)
+
+        def failed(exc):
+            entry_list.fetching = False
+
+        api.run(worker.fetch_older, kind, on_success=fetched, on_error=failed)
+
+    def on_scroll(kind):
+        def handler(e):
+            if e.max_scroll_extent and e.pixels >= e.max_scroll_extent - 200:
+                load_older(kind)
+        return handler
+
+    mood_history.on_scroll = on_scroll("mood")
+    activities_list.on_scroll = on_scroll("activity")
+    journal_entries.on_scroll = on_scroll("journal")
+    for list_view in (mood_history, activities_list, journal_entries):
+        list_view.on_scroll_interval = 100
+
+    def show_error(exc):
+        show_snackbar(f"Error: {str(exc)}")
+
+    def sync_status(online):
+        if online:
+            show_snackbar("Synced", ft.Colors.GREEN)
+        else:
+            show_snackbar("Offline - new entries will sync when the server is reachable", ft.Colors.ORANGE)
+
+    def start_sync(username):
+        # Show what is already on disk right away, then sync in the background
+        stop_sync()
+        store = LocalStore(username)
+        worker = SyncWorker(store, api, on_change=refresh_lists, on_status=sync_status)
+        listener = PushListener(store, api, worker, on_change=refresh_lists)
+        sync_state["store"], sync_state["worker"], sync_state["listener"] = store, worker, listener
+        for entry_list in lists.values():
+            entry_list.load(store)
+        worker.start()
+        listener.start()
+
+    def save_entry(kind, fields):
+        # Written locally first so logging never waits on (or fails with) the network
+        sync_state["store"].add_pending(kind, fields)
+        lists[kind].refresh(sync_state["store"])
+        # Upload only; the server pushes the stored entry back over /events
+        sync_state["worker"].trigger(pull=False)
 
     def submit_mood(e):
         if not mood_slider.value:
             show_snackbar("Please select a mood score!")
             return
 
-        try:
-            response = requests.post(
-                "http://localhost:8000/mood",
-                data={
-                    "username": current_user.value,
-                    "password": current_password.value,
-                    "score": int(mood_slider.value),
-                    "notes": mood_notes.value
-                },
-                headers={"Content-Type": "application/x-www-form-urlencoded"}
-            )
-            
-            if response.status_code == 200:
-                show_snackbar("Mood logged successfully!", ft.Colors.GREEN)
-                mood_slider.value = 5
-                mood_notes.value = ""
-                fetch_mood_history()  # Refresh history after submission
-            else:
-                show_snackbar(f"Error: {response.json().get('detail', 'Failed to log mood')}")
-        except Exception as e:
-            show_snackbar(f"Connection error: {str(e)}")
-
-    def fetch_activities():
-        try:
-            response = requests.post(
-                "http://localhost:8000/activity_history",
-                data={
-                    "username": current_user.value,
-                    "password": current_password.value
-                },
-                headers={"Content-Type": "application/x-www-form-urlencoded"}
-            )
-            if response.status_code == 200:
-                activities_list.controls.clear()
-                for entry in response.json():
-                    activities_list.controls.append(
-                        ft.ListTile(
-                            title=ft.Text(entry["activity"]),
-                            subtitle=ft.Text(f"{entry['duration']} minutes"),
-                            trailing=ft.Text(datetime.fromisoformat(entry["created_at"]).strftime("%H:%M"))
-                        )
-                    )
-                page.update()
-            else:
-                show_snackbar("Failed to fetch activities")
-        except Exception as e:
-            show_snackbar(f"Error: {str(e)}")
+        save_entry("mood", {"score": int(mood_slider.value), "notes": mood_notes.value or None})
+        show_snackbar("Mood logged successfully!", ft.Colors.GREEN)
+        mood_slider.value = 5
+        mood_notes.value = ""
+        page.update()
 
     def add_activity(e):
         if not activity_input.value or not activity_duration.value:
             show_snackbar("Please enter activity and duration!")
             return
         try:
-            response = requests.post(
-                "http://localhost:8000/activity",
-                data={
-                    "username": current_user.value,
-                    "password": current_password.value,
-                    "activity": activity_input.value,
-                    "duration": int(activity_duration.value)
-                },
-                headers={"Content-Type": "application/x-www-form-urlencoded"}
-            )
-            if response.status_code == 200:
-                activity_input.value = ""
-                activity_duration.value = ""
-                fetch_activities()
-            else:
-                show_snackbar("Failed to log activity")
-        except Exception as e:
-            show_snackbar(f"Error: {str(e)}")
+            duration = int(activity_duration.value)
+        except ValueError:
+            show_snackbar("Minutes must be a number!")
+            return
 
-    def fetch_journal_entries():
-        try:
-            response = requests.post(
-                "http://localhost:8000/journal_history",
-                data={
-                    "username": current_user.value,
-                    "password": current_password.value
-                },
-                headers={"Content-Type": "application/x-www-form-urlencoded"}
-            )
-            if response.status_code == 200:
-                journal_entries.controls.clear()
-                for entry in response.json():
-                    journal_entries.controls.append(
-                        ft.ListTile(
-                            title=ft.Text(datetime.fromisoformat(entry["created_at"]).strftime("%b %d, %H:%M")),
-                            subtitle=ft.Text(entry["entry"])
-                        )
-                    )
-                page.update()
-            else:
-                show_snackbar("Failed to fetch journal entries")
-        except Exception as e:
-            show_snackbar(f"Error: {str(e)}")
+        save_entry("activity", {"activity": activity_input.value, "duration": duration})
+        activity_input.value = ""
+        activity_duration.value = ""
+        page.update()
 
     def add_journal_entry(e):
         if not journal_entry.value:
             show_snackbar("Journal entry cannot be empty!")
             return
-        try:
-            response = requests.post(
-                "http://localhost:8000/journal",
-                data={
-                    "username": current_user.value,
-                    "password": current_password.value,
-                    "entry": journal_entry.value
-                },
-                headers={"Content-Type": "application/x-www-form-urlencoded"}
-            )
-            if response.status_code == 200:
-                journal_entry.value = ""
-                fetch_journal_entries()
-            else:
-                show_snackbar("Failed to save journal entry")
-        except Exception as e:
-            show_snackbar(f"Error: {str(e)}")
+
+        save_entry("journal", {"entry": journal_entry.value})
+        journal_entry.value = ""
+        page.update()
 
     def change_tab(index):
-        content_column.controls.clear()
-        
-        if index == 0:  # Mood
-            content_column.controls.extend([
-                ft.Text("How are you feeling today?", size=20),
-                mood_slider,
-                mood_notes,
-                ft.ElevatedButton("Log Mood", on_click=lambda e: submit_mood(e)),
-                ft.Divider(),
-                ft.Text("Recent Mood Entries", size=16),
-                mood_history
-            ])
-        
-        elif index == 1:  # Activities
-            content_column.controls.extend([
-                ft.Text("Track Your Activities", size=20),
-                ft.Row([activity_input, activity_duration]),
-                ft.ElevatedButton("Add Activity", on_click=add_activity),
-                ft.Divider(),
-                ft.Text("Today's Activities", size=16),
-                activities_list
-            ])
-        
-        elif index == 2:  # Journal
-            content_column.controls.extend([
-                ft.Text("Journal Entry", size=20),
-                journal_entry,
-                ft.ElevatedButton("Save Entry", on_click=add_journal_entry),
-                ft.Divider(),
-                ft.Text("Previous Entries", size=16),
-                journal_entries
-            ])
-        
+        for i, view in enumerate(tab_views):
+            view.visible = i == index
         page.update()
 
     def show_snackbar(message, color=ft.Colors.RED):
@@ -294,32 +298,23 @@ def main(page: ft.Page):
     login_password = ft.TextField(label="Password", password=True)
     
     def login(e):
-        try:
-            # Clear any existing data first
-            mood_history.controls.clear()
-            activities_list.controls.clear()
-            journal_entries.controls.clear()
-            
-            response = requests.post(
-                "http://localhost:8000/login",
-                data={
-                    "username": login_username.value,
-                    "password": login_password.value
-                },
-                headers={"Content-Type": "application/x-www-form-urlencoded"}
-            )
-            if response.status_code == 200:
-                current_user.value = login_username.value
-                current_password.value = login_password.value
-                show_snackbar("Login successful!", ft.Colors.GREEN)
-                page.go("/dashboard")
-                fetch_mood_history()
-                fetch_activities()
-                fetch_journal_entries()
-            else:
+        # Clear any existing data first
+        for entry_list in lists.values():
+            entry_list.reset()
+
+        def logged_in(_):
+            current_user.value = login_username.value
+            show_snackbar("Login successful!", ft.Colors.GREEN)
+            page.go("/dashboard")
+            start_sync(login_username.value)
+
+        def failed(exc):
+            if getattr(exc, "status_code", None) == 401:
                 show_snackbar("Invalid credentials")
-        except Exception as e:
-            show_snackbar(f"Error: {str(e)}")
+            else:
+                show_error(exc)
+
+        api.run(api.login, login_username.value, login_password.value, on_success=logged_in, on_error=failed)
 
     # Registration view
     register_username = ft.TextField(label="Username")
@@ -331,32 +326,26 @@ def main(page: ft.Page):
             show_snackbar("Username and password are required!")
             return
 
-        try:
-            response = requests.post(
-                "http://localhost:8000/register",
-                data={
-                    "username": register_username.value,
-                    "password": register_password.value,
-                    "email": register_email.value
-                },
-                headers={"Content-Type": "application/x-www-form-urlencoded"}
-            )
-            
-            if response.status_code == 200:
-                show_snackbar("Registration successful! Please login.", ft.Colors.GREEN)
-                page.go("/login")
-            else:
-                show_snackbar(f"Error: {response.json().get('detail', 'Registration failed')}")
-        except Exception as e:
-            show_snackbar(f"Connection error: {str(e)}")
+        def registered(_):
+            show_snackbar("Registration successful! Please login.", ft.Colors.GREEN)
+            page.go("/login")
+
+        api.run(
+            api.register, register_username.value, register_password.value, register_email.value or None,
+            on_success=registered,
+            on_error=lambda exc: show_snackbar(f"Error: {getattr(exc, 'detail', str(exc))}")
+        )
 
     def logout(e):
+        # The token expires on its own if the server is unreachable; entries
+        # still queued locally are uploaded at the next login
+        stop_sync()
+        api.logout()
+
         # Clear all user data
         current_user.value = ""
-        current_password.value = ""
-        mood_history.controls.clear()
-        activities_list.controls.clear()
-        journal_entries.controls.clear()
+        for entry_list in lists.values():
+            entry_list.reset()
         page.go("/login")
 
         
@@ -0,0 +1,338 @@
+# local_store.py
+# On-disk mirror of the signed-in user's entries. The dashboard reads from
+# here, so it opens instantly and keeps working offline; entries logged
+# while offline are stored as pending rows and pushed by SyncWorker.
+import json
+import os
+import re
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+
+KINDS = ("mood", "activity", "journal")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    kind TEXT NOT NULL,
+    server_id INTEGER,          -- NULL until the server has accepted the entry
+    client_key TEXT,            -- idempotency key for entries created here
+    created_at TEXT NOT NULL,
+    data TEXT NOT NULL,         -- the entry as JSON, as the API returns it
+    seq INTEGER NOT NULL DEFAULT 0,  -- bumped on every write, so views can fetch only what changed
+    UNIQUE (kind, server_id),
+    UNIQUE (kind, client_key)
+);
+CREATE INDEX IF NOT EXISTS ix_entries_kind_created ON entries (kind, created_at DESC);
+CREATE INDEX IF NOT EXISTS ix_entries_kind_seq ON entries (kind, seq);
+CREATE INDEX IF NOT EXISTS ix_entries_seq ON entries (seq);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+_NEXT_SEQ = "(SELECT coalesce(max(seq), 0) + 1 FROM entries)"
+
+
+def user_data_dir() -> str:
+    base = os.environ.get("MENTALHEALTH_DATA_DIR")
+    if not base:
+        if os.name == "nt":
+            base = os.path.join(os.environ.get("APPDATA", os.path.expanduser("~")), "MentalHealthTracker")
+        else:
+            xdg = os.environ.get("XDG_DATA_HOME", os.path.join(os.path.expanduser("~"), ".local", "share"))
+            base = os.path.join(xdg, "mentalhealth-tracker")
+    os.makedirs(base, exist_ok=True)
+    return base
+
+
+class LocalStore:
+    def __init__(self, username, path=None):
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", username)
+        self.path = path or os.path.join(user_data_dir(), f"{safe_name}.db")
+        # Used from the UI thread and the sync thread, serialized by the lock
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(entries)")}
+            if columns and "seq" not in columns:
+                # Store created before entries carried a sequence number
+                self._conn.execute("ALTER TABLE entries ADD COLUMN seq INTEGER NOT NULL DEFAULT 0")
+            self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # Reads
+
+    @staticmethod
+    def _to_entry(row):
+        entry = json.loads(row["data"])
+        entry["local_id"] = row["rowid"]
+        entry["seq"] = row["seq"]
+        entry["pending"] = row["server_id"] is None
+        return entry
+
+    def entries(self, kind, limit=50, before=None):
+        """Newest-first entries of one kind, pending ones included.
+
+        `before` is the (created_at, local_id) of the last entry already shown.
+        """
+        query = "SELECT rowid, seq, server_id, data FROM entries WHERE kind = ?"
+        params = [kind]
+        if before:
+            query += " AND (created_at, rowid) < (?, ?)"
+            params.extend(before)
+        query += " ORDER BY created_at DESC, rowid DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [self._to_entry(row) for row in rows]
+
+    def changed(self, kind, since_seq):
+        """Entries added or updated after `since_seq`, in write order."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT rowid, seq, server_id, data FROM entries WHERE kind = ? AND seq > ? ORDER BY seq",
+                (kind, since_seq),
+            ).fetchall()
+        return [self._to_entry(row) for row in rows]
+
+    def max_seq(self):
+        with self._lock:
+            return self._conn.execute("SELECT coalesce(max(seq), 0) FROM entries").fetchone()[0]
+
+    def pending(self):
+        """Entries not yet accepted by the server, as /batch items."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT kind, client_key, data FROM entries WHERE server_id IS NULL ORDER BY created_at"
+            ).fetchall()
+        items = []
+        for row in rows:
+            item = json.loads(row["data"])
+            item.pop("id", None)
+            item["type"] = row["kind"]
+            item["idempotency_key"] = row["client_key"]
+            items.append(item)
+        return items
+
+    def get_meta(self, key, default=None):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else default
+
+    # Writes
+
+    def set_meta(self, key, value):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO meta (key, value) VALUES (?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                (key, value),
+            )
+
+    def add_pending(self, kind, fields):
+        """Store a new local entry and return it; SyncWorker uploads it later."""
+        entry = dict(fields)
+        entry["client_key"] = uuid.uuid4().hex
+        entry["created_at"] = datetime.utcnow().isoformat()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO entries (kind, server_id, client_key, created_at, data, seq) "
+                f"VALUES (?, NULL, ?, ?, ?, {_NEXT_SEQ})",
+                (kind, entry["client_key"], entry["created_at"], json.dumps(entry)),
+            )
+        return entry
+
+    def merge(self, kind, items):
+        """Upsert entries received from the server; returns how many rows changed."""
+        added = 0
+        with self._lock, self._conn:
+            for item in items:
+                data = json.dumps(item)
+                key = item.get("client_key")
+                if key:
+                    # Our own pending entry coming back from the server
+                    cursor = self._conn.execute(
+                        f"UPDATE entries SET server_id = ?, data = ?, seq = {_NEXT_SEQ} "
+                        "WHERE kind = ? AND client_key = ? AND server_id IS NULL",
+                        (item["id"], data, kind, key),
+                    )
+                    if cursor.rowcount:
+                        added += 1
+                        continue
+                cursor = self._conn.execute(
+                    "INSERT INTO entries (kind, server_id, client_key, created_at, data, seq) "
+                    f"VALUES (?, ?, ?, ?, ?, {_NEXT_SEQ}) "
+                    "ON CONFLICT DO NOTHING",
+                    (kind, item["id"], key, item["created_at"], data),
+                )
+                added += cursor.rowcount
+        return added
+
+    def mark_synced(self, results):
+        """Record server ids from a /batch response."""
+        with self._lock, self._conn:
+            for result in results:
+                self._conn.execute(
+                    f"UPDATE entries SET server_id = ?, data = json_set(data, '$.id', ?), seq = {_NEXT_SEQ} "
+                    "WHERE kind = ? AND client_key = ? AND server_id IS NULL",
+                    (result["id"], result["id"], result["type"], result["idempotency_key"]),
+                )
+
+
+class SyncWorker(threading.Thread):
+    """Pushes pending entries and pulls remote changes in the background."""
+
+    def __init__(self, store, api, on_change=None, on_status=None, interval=30):
+        super().__init__(daemon=True, name="sync")
+        self.store = store
+        self.api = api
+        self.on_change = on_change
+        self.on_status = on_status
+        self.interval = interval
+        self.online = None
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._pull_requested = True
+        # Set by PushListener while /events is connected; pushed entries make
+        # pulling after every local write unnecessary
+        self.live = threading.Event()
+
+    def trigger(self, pull=True):
+        """Sync now; pull=False only uploads pending entries."""
+        self._pull_requested |= pull
+        self._wake.set()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+
+    def run(self):
+        while not self._stopped.is_set():
+            pull, self._pull_requested = self._pull_requested, False
+            try:
+                changed = self.push()
+                if pull or not self.live.is_set():
+                    changed |= self.pull()
+                self._set_online(True)
+                if changed and self.on_change:
+                    self.on_change()
+            except Exception:
+                # Offline or server error: keep the queue and try again later
+                self._set_online(False)
+                self._pull_requested = True
+            if not self._wake.wait(self.interval):
+                # Periodic safety net even while live
+                self._pull_requested = True
+            self._wake.clear()
+
+    def _set_online(self, online):
+        if online != self.online:
+            self.online = online
+            if self.on_status:
+                self.on_status(online)
+
+    def sync_once(self):
+        changed = self.push()
+        return self.pull() or changed
+
+    def push(self):
+        items = self.store.pending()
+        if not items:
+            return False
+        response = self.api.batch(items)
+        self.store.mark_synced(response["items"])
+        return True
+
+    def pull(self):
+        cursor = self.store.get_meta("changes_cursor")
+        changed = False
+        if cursor is None:
+            # First sync on this device: seed the mirror with the dashboard
+            data = self.api.dashboard()
+            for kind in KINDS:
+                changed |= self.store.merge(kind, data[kind]["items"]) > 0
+                self.store.set_meta(f"history_cursor:{kind}", data[kind]["next_cursor"] or "")
+            self.store.set_meta("changes_cursor", data["changes_cursor"])
+            return changed
+
+        has_more = True
+        while has_more:
+            data = self.api.changes(cursor)
+            for kind in KINDS:
+                changed |= self.store.merge(kind, data[kind]) > 0
+            cursor = data["next_cursor"]
+            self.store.set_meta("changes_cursor", cursor)
+            has_more = data["has_more"]
+        return changed
+
+    def fetch_older(self, kind, limit=50):
+        """Download the next page of server history below what the store holds.
+
+        Returns the number of entries added; 0 once the whole history is local.
+        """
+        cursor = self.store.get_meta(f"history_cursor:{kind}")
+        if cursor == "":
+            return 0
+        # A missing cursor means the store predates history paging: walk from
+        # the top; entries already stored are skipped by merge()
+        data = self.api.history(kind, cursor, limit)
+        added = self.store.merge(kind, data["items"])
+        self.store.set_meta(f"history_cursor:{kind}", data["next_cursor"] or "")
+        if not added and data["next_cursor"]:
+            return self.fetch_older(kind, limit)
+        return added
+
+
+class PushListener(threading.Thread):
+    """Merges entries pushed over GET /events into the store as they arrive."""
+
+    def __init__(self, store, api, worker, on_change=None, retry_delay=5, max_delay=60):
+        super().__init__(daemon=True, name="events")
+        self.store = store
+        self.api = api
+        self.worker = worker
+        self.on_change = on_change
+        self.retry_delay = retry_delay
+        self.max_delay = max_delay
+        self._stopped = threading.Event()
+
+    def stop(self):
+        # Takes effect at the next event or keep-alive
+        self._stopped.set()
+
+    def run(self):
+        delay = self.retry_delay
+        while not self._stopped.is_set():
+            try:
+                for event, data in self.api.events():
+                    if self._stopped.is_set():
+                        return
+                    if not self.worker.live.is_set():
+                        # Connected: catch up on anything missed while the
+                        # stream was down, then rely on pushes
+                        self.worker.live.set()
+                        self.worker.trigger()
+                        delay = self.retry_delay
+                    self.handle(event, data)
+            except Exception:
+                pass
+            self.worker.live.clear()
+            self._stopped.wait(delay)
+            delay = min(delay * 2, self.max_delay)
+
+    def handle(self, event, data):
+        if event == "resync":
+            self.worker.trigger()
+            return
+        if event != "entries":
+            return
+        changed = False
+        for kind in KINDS:
+            if data.get(kind):
+                changed |= self.store.merge(kind, data[kind]) > 0
+        if changed and self.on_change:
+            self.on_change()
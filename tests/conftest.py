@@ -0,0 +1,56 @@
+# conftest.py
+# The app reads its settings and creates its engines at import time, so the
+# environment is set up here before anything from mentalhealth_app is imported.
+# Every test session gets a fresh SQLite database in a temporary directory.
+import atexit
+import itertools
+import os
+import shutil
+import tempfile
+
+_tmpdir = tempfile.mkdtemp(prefix="mentalhealth-tests-")
+atexit.register(shutil.rmtree, _tmpdir, ignore_errors=True)
+os.environ["MENTALHEALTH_DATABASE_URL"] = "sqlite:///" + os.path.join(_tmpdir, "test.db")
+os.environ["MENTALHEALTH_PROFILING_DIR"] = os.path.join(_tmpdir, "profiles")
+# Cheap hashes keep registration fast; the scheme is the same
+os.environ.setdefault("MENTALHEALTH_SCRYPT_N", "1024")
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+
+_usernames = itertools.count()
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def client():
+    from mentalhealth_app.business.app import app
+    from mentalhealth_app.data.database import async_engine
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+    # Pooled aiosqlite connections belong to this test's event loop
+    await async_engine.dispose()
+
+
+async def register(client, password="secret-password"):
+    """Create a fresh user and return (username, auth headers)."""
+    username = f"user{next(_usernames)}"
+    response = await client.post("/register", data={"username": username, "password": password})
+    assert response.status_code == 200, response.text
+    return username, await login(client, username, password)
+
+
+async def login(client, username, password="secret-password"):
+    response = await client.post("/login", data={"username": username, "password": password})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+async def user(client):
+    return await register(client)
@@ -0,0 +1,22 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_trends_group_activities_like_activity_totals(client, user):
+    username, headers = user
+    items = []
+    for day, name in enumerate(["Morning  run", "morning run", " Morning Run", "Reading", "Reading"]):
+        created_at = f"2026-01-{day + 1:02d}T09:00:00"
+        items.append({"type": "mood", "idempotency_key": f"m{day}", "score": 5 + day % 3, "created_at": created_at})
+        items.append({
+            "type": "activity", "idempotency_key": f"a{day}", "activity": name, "duration": 30,
+            "created_at": created_at,
+        })
+    assert (await client.post("/batch", json=items, headers=headers)).status_code == 200
+
+    trends = (await client.get(f"/insights/{username}/trends", params={"range": "all"}, headers=headers)).json()
+    totals = (await client.get("/activity_totals", params={"range": "all"}, headers=headers)).json()
+    trend_names = sorted(item["activity"] for item in trends["activities"])
+    total_names = sorted(item["activity"] for item in totals["totals"])
+    assert trend_names == total_names == ["morning run", "reading"]
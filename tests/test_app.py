@@ -0,0 +1,27 @@
+import asyncio
+import threading
+
+import httpx
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+def _aiosqlite_threads():
+    return [t for t in threading.enumerate() if "_connection_worker_thread" in t.name and t.is_alive()]
+
+
+async def test_shutdown_closes_database_connections():
+    from mentalhealth_app.business.app import app
+
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            assert (await client.get("/dashboard")).status_code == 401
+            assert (await client.post("/login", data={"username": "nobody", "password": "x"})).status_code == 401
+        assert _aiosqlite_threads()
+
+    for _ in range(50):
+        if not _aiosqlite_threads():
+            break
+        await asyncio.sleep(0.01)
+    assert not _aiosqlite_threads()
@@ -0,0 +1,64 @@
+import pytest
+
+from .conftest import register
+
+pytestmark = pytest.mark.anyio
+
+ITEMS = [
+    {"type": "mood", "idempotency_key": "m1", "score": 4, "created_at": "2026-03-01T08:00:00"},
+    {"type": "mood", "idempotency_key": "m2", "score": 8, "created_at": "2026-03-01T20:00:00"},
+    {"type": "activity", "idempotency_key": "a1", "activity": "Yoga", "duration": 20},
+    {"type": "journal", "idempotency_key": "j1", "entry": "Slept well"},
+]
+
+
+async def _batch(client, headers, items):
+    response = await client.post("/batch", json=items, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def test_resending_a_batch_is_a_no_op(client, user):
+    username, headers = user
+    first = await _batch(client, headers, ITEMS)
+    assert first["created"] == {"mood": 2, "activity": 1, "journal": 1}
+    assert [item["status"] for item in first["items"]] == ["created"] * 4
+
+    second = await _batch(client, headers, ITEMS)
+    assert second["created"] == {}
+    assert [item["status"] for item in second["items"]] == ["duplicate"] * 4
+    assert [item["id"] for item in second["items"]] == [item["id"] for item in first["items"]]
+
+    history = (await client.get("/mood_history", headers=headers)).json()
+    assert len(history["items"]) == 2
+    # The mood rollups count each entry once
+    insights = (await client.get(f"/insights/{username}", headers=headers)).json()
+    assert insights["entry_count"] == 2
+    assert insights["average_mood"] == 6
+
+
+async def test_partly_sent_batch(client, user):
+    _, headers = user
+    await _batch(client, headers, ITEMS[:2])
+    result = await _batch(client, headers, ITEMS)
+    assert result["created"] == {"activity": 1, "journal": 1}
+    assert [item["status"] for item in result["items"]] == ["duplicate", "duplicate", "created", "created"]
+
+
+async def test_keys_are_per_user_and_per_type(client, user):
+    _, headers = user
+    _, other = await register(client)
+    await _batch(client, headers, ITEMS)
+    result = await _batch(client, other, ITEMS)
+    assert result["created"] == {"mood": 2, "activity": 1, "journal": 1}
+
+    same_key = [{"type": "journal", "idempotency_key": "m1", "entry": "Same key, other type"}]
+    assert (await _batch(client, headers, same_key))["created"] == {"journal": 1}
+
+
+async def test_invalid_batch_is_rejected_whole(client, user):
+    _, headers = user
+    items = ITEMS[:1] + [{"type": "mood", "idempotency_key": "bad", "score": 11}]
+    response = await client.post("/batch", json=items, headers=headers)
+    assert response.status_code == 422
+    assert (await client.get("/mood_history", headers=headers)).json()["items"] == []
@@ -0,0 +1,87 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from mentalhealth_app.business import charts
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    """Render in a thread with a fake renderer; returns the list of rendered titles."""
+    done = []
+    pool = ThreadPoolExecutor(max_workers=2)
+
+    def render(dates, scores, title, width, height):
+        done.append(title)
+        return f"png:{title}".encode()
+
+    monkeypatch.setattr(charts, "get_pool", lambda: pool)
+    monkeypatch.setattr(charts, "render_mood_chart", render)
+    yield done
+    pool.shutdown()
+
+
+def _key(user_id):
+    charts.chart_cache.clear()
+    return charts.ChartKey(user_id=user_id, latest_entry_id=1, width=100, height=50)
+
+
+async def test_concurrent_misses_render_once(renders):
+    key = _key(1)
+
+    async def load_points():
+        await asyncio.sleep(0.05)
+        return [], []
+
+    results = await asyncio.gather(*(charts.get_mood_chart(key, load_points, "t") for _ in range(5)))
+    assert results == [b"png:t"] * 5
+    assert renders == ["t"]
+
+
+async def test_cancelled_owner_does_not_fail_waiters(renders):
+    key = _key(2)
+    started = asyncio.Event()
+
+    async def stuck():
+        started.set()
+        await asyncio.sleep(60)
+
+    async def load_points():
+        return [], []
+
+    owner = asyncio.create_task(charts.get_mood_chart(key, stuck, "owner"))
+    await started.wait()
+    waiters = [asyncio.create_task(charts.get_mood_chart(key, load_points, "waiter")) for _ in range(3)]
+    await asyncio.sleep(0)
+    owner.cancel()
+
+    assert await asyncio.gather(*waiters) == [b"png:waiter"] * 3
+    assert renders == ["waiter"]
+    with pytest.raises(asyncio.CancelledError):
+        await owner
+
+
+async def test_waiters_retry_once_after_a_failed_render(renders):
+    key = _key(3)
+    calls = []
+
+    async def failing():
+        calls.append("fail")
+        await asyncio.sleep(0.01)
+        raise RuntimeError("database went away")
+
+    async def load_points():
+        calls.append("ok")
+        return [], []
+
+    owner = asyncio.create_task(charts.get_mood_chart(key, failing, "owner"))
+    await asyncio.sleep(0)
+    waiters = [asyncio.create_task(charts.get_mood_chart(key, load_points, "waiter")) for _ in range(3)]
+
+    with pytest.raises(RuntimeError):
+        await owner
+    assert await asyncio.gather(*waiters) == [b"png:waiter"] * 3
+    assert calls == ["fail", "ok"]
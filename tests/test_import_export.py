@@ -0,0 +1,118 @@
+import orjson
+import pytest
+
+from .conftest import register
+
+pytestmark = pytest.mark.anyio
+
+
+def _ndjson(*records):
+    return b"".join(orjson.dumps(record) + b"\n" for record in records)
+
+
+async def _import(client, headers, body, fmt="ndjson"):
+    response = await client.post("/import", params={"format": fmt}, content=body, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def _log_entries(client, headers):
+    await client.post("/mood", data={"score": 6, "notes": "fine"}, headers=headers)
+    await client.post("/mood", data={"score": 3}, headers=headers)
+    await client.post("/activity", data={"activity": "Walking", "duration": 30}, headers=headers)
+    await client.post("/journal", data={"entry": "A quiet day"}, headers=headers)
+
+
+async def test_rows_without_id_or_key_are_all_imported(client, user):
+    _, headers = user
+    body = _ndjson(
+        {"type": "mood", "score": 5}, {"type": "mood", "score": 5},
+        {"type": "journal", "entry": "one"}, {"type": "journal", "entry": "one"},
+    )
+    summary = await _import(client, headers, body)
+    assert summary["created"] == {"mood": 2, "activity": 0, "journal": 2}
+    assert summary["duplicates"] == 0
+
+    csv_body = b"type,score\nmood,4\nmood,4\n"
+    summary = await _import(client, headers, csv_body, fmt="csv")
+    assert summary["created"]["mood"] == 2
+    assert summary["duplicates"] == 0
+
+
+@pytest.mark.parametrize("fmt", ["ndjson", "csv"])
+async def test_reimporting_own_export_is_a_no_op(client, user, fmt):
+    _, headers = user
+    await _log_entries(client, headers)
+    exported = (await client.get("/export", params={"format": fmt}, headers=headers)).content
+
+    summary = await _import(client, headers, exported, fmt=fmt)
+    assert summary["created"] == {"mood": 0, "activity": 0, "journal": 0}
+    assert summary["duplicates"] == 4
+    assert summary["invalid"] == 0
+
+
+async def test_importing_into_another_account_twice(client, user):
+    _, headers = user
+    await _log_entries(client, headers)
+    exported = (await client.get("/export", headers=headers)).content
+
+    _, other = await register(client)
+    first = await _import(client, other, exported)
+    assert first["created"] == {"mood": 2, "activity": 1, "journal": 1}
+    second = await _import(client, other, exported)
+    assert second["created"] == {"mood": 0, "activity": 0, "journal": 0}
+    assert second["duplicates"] == 4
+
+
+async def test_same_id_with_different_contents_is_imported(client, user):
+    _, headers = user
+    await client.post("/mood", data={"score": 6}, headers=headers)
+    stored = (await client.get("/mood_history", headers=headers)).json()["items"][0]
+
+    body = _ndjson({"type": "mood", "id": stored["id"], "score": 2, "created_at": stored["created_at"]})
+    summary = await _import(client, headers, body)
+    assert summary["created"]["mood"] == 1
+    assert summary["duplicates"] == 0
+
+
+async def test_unreadable_lines_are_reported(client, user, monkeypatch):
+    from mentalhealth_app.business import export
+
+    monkeypatch.setattr(export, "MAX_LINE_BYTES", 200)
+    _, headers = user
+    body = (
+        _ndjson({"type": "mood", "score": 5})
+        + b'{"type": "journal", "entry": "caf\xe9"}\n'
+        + b'{"type": "journal", "entry": "' + b"x" * 500 + b'"}\n'
+        + _ndjson({"type": "mood", "score": 6})
+    )
+    summary = await _import(client, headers, body)
+    assert summary["created"]["mood"] == 2
+    assert summary["invalid"] == 2
+    assert [error["line"] for error in summary["errors"]] == [2, 3]
+    assert "UTF-8" in summary["errors"][0]["error"]
+
+
+async def test_unterminated_csv_quote_is_reported(client, user):
+    _, headers = user
+    body = b'type,score,notes\nmood,5,ok\nmood,6,"never closed\nmood,7,lost\n'
+    summary = await _import(client, headers, body, fmt="csv")
+    assert summary["created"]["mood"] == 1
+    assert summary["errors"] == [{"line": 3, "error": "Unterminated quoted field"}]
+
+
+async def test_long_line_across_chunks_is_not_buffered(monkeypatch):
+    from mentalhealth_app.business import export
+
+    monkeypatch.setattr(export, "MAX_LINE_BYTES", 100)
+
+    async def chunks():
+        yield b"first\n" + b"x" * 80
+        for _ in range(10):
+            yield b"x" * 80
+        yield b"x\nlast"
+
+    lines = [line async for line in export._lines(chunks())]
+    assert lines[0] == "first"
+    assert isinstance(lines[1], ValueError)
+    assert lines[2:] == ["last"]
@@ -0,0 +1,87 @@
+from sqlalchemy import create_engine, inspect, text
+
+from mentalhealth_app.data.database import Base
+from mentalhealth_app.data.migrations import MIGRATIONS, check_query_plans, current_version, migrate
+
+# The schema as the first release created it, before any migration existed
+BASELINE_SCHEMA = (
+    "CREATE TABLE users (id INTEGER NOT NULL PRIMARY KEY, username VARCHAR, email VARCHAR,"
+    " hashed_password VARCHAR, created_at DATETIME)",
+    "CREATE INDEX ix_users_id ON users (id)",
+    "CREATE UNIQUE INDEX ix_users_username ON users (username)",
+    "CREATE INDEX ix_users_email ON users (email)",
+    "CREATE TABLE mood_entries (id INTEGER NOT NULL PRIMARY KEY, user_id INTEGER, score INTEGER,"
+    " notes VARCHAR, created_at DATETIME)",
+    "CREATE INDEX ix_mood_entries_id ON mood_entries (id)",
+    "CREATE INDEX ix_mood_entries_user_id ON mood_entries (user_id)",
+    "CREATE TABLE activity_entries (id INTEGER NOT NULL PRIMARY KEY, user_id INTEGER, activity VARCHAR,"
+    " duration INTEGER, created_at DATETIME)",
+    "CREATE INDEX ix_activity_entries_id ON activity_entries (id)",
+    "CREATE INDEX ix_activity_entries_user_id ON activity_entries (user_id)",
+    "CREATE TABLE journal_entries (id INTEGER NOT NULL PRIMARY KEY, user_id INTEGER, entry VARCHAR,"
+    " created_at DATETIME)",
+    "CREATE INDEX ix_journal_entries_id ON journal_entries (id)",
+    "CREATE INDEX ix_journal_entries_user_id ON journal_entries (user_id)",
+)
+
+
+def _baseline_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'baseline.db'}")
+    with engine.begin() as connection:
+        for statement in BASELINE_SCHEMA:
+            connection.execute(text(statement))
+        connection.execute(text(
+            "INSERT INTO users (id, username, hashed_password, created_at)"
+            " VALUES (1, 'old', 'hashed_pw', '2024-01-01 08:00:00')"
+        ))
+        connection.execute(text(
+            "INSERT INTO mood_entries (user_id, score, created_at) VALUES"
+            " (1, 4, '2024-01-01 09:00:00'), (1, 8, '2024-01-01 18:00:00'), (1, 6, '2024-01-02 09:00:00')"
+        ))
+        connection.execute(text(
+            "INSERT INTO activity_entries (user_id, activity, duration, created_at)"
+            " VALUES (1, ' Morning  Run ', 30, '2024-01-01 07:00:00')"
+        ))
+        connection.execute(text(
+            "INSERT INTO journal_entries (user_id, entry, created_at)"
+            " VALUES (1, 'A long walk by the river', '2024-01-01 20:00:00')"
+        ))
+    return engine
+
+
+def test_upgrade_from_baseline(tmp_path):
+    engine = _baseline_engine(tmp_path)
+    # What the app does at startup
+    import mentalhealth_app.business.models  # noqa: F401
+    Base.metadata.create_all(bind=engine)
+    applied = migrate(engine)
+
+    assert applied == [number for number, _, _ in MIGRATIONS]
+    with engine.connect() as connection:
+        assert current_version(connection) == MIGRATIONS[-1][0]
+        columns = {c["name"] for c in inspect(connection).get_columns("activity_entries")}
+        assert {"activity_key", "client_key"} <= columns
+        indexes = {i["name"]: i["column_names"] for i in inspect(connection).get_indexes("activity_entries")}
+        assert indexes["ix_activity_entries_user_created"] == [
+            "user_id", "created_at", "id", "activity_key", "duration",
+        ]
+        assert connection.scalar(text("SELECT activity_key FROM activity_entries")) == "morning run"
+        assert connection.execute(text(
+            "SELECT entry_count, score_sum FROM mood_user_stats WHERE user_id = 1"
+        )).one() == (3, 18)
+        assert connection.scalar(text("SELECT count(*) FROM mood_daily_rollups")) == 2
+        assert connection.scalar(text("SELECT password_changed_at FROM users")) is not None
+        assert connection.scalar(text("SELECT count(*) FROM journal_fts WHERE journal_fts MATCH 'walk'")) == 1
+
+    check_query_plans(engine)
+    assert migrate(engine) == []
+
+
+def test_fresh_database_is_current(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    import mentalhealth_app.business.models  # noqa: F401
+    Base.metadata.create_all(bind=engine)
+    migrate(engine)
+    with engine.connect() as connection:
+        assert current_version(connection) == MIGRATIONS[-1][0]
+    check_query_plans(engine)
@@ -0,0 +1,68 @@
+import pytest
+
+from .conftest import register
+
+pytestmark = pytest.mark.anyio
+
+
+async def _pages(client, path, headers, limit):
+    items, cursor = [], None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        response = await client.get(path, params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        page = response.json()
+        assert len(page["items"]) <= limit
+        items.extend(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return items
+
+
+async def test_pages_cover_every_entry_once_newest_first(client, user):
+    _, headers = user
+    # Pairs of entries share a timestamp, so the id has to break ties
+    items = [
+        {"type": "mood", "idempotency_key": f"k{i}", "score": 1 + i % 10,
+         "created_at": f"2026-02-{1 + i // 2:02d}T12:00:00"}
+        for i in range(23)
+    ]
+    assert (await client.post("/batch", json=items, headers=headers)).status_code == 200
+    _, other = await register(client)
+    await client.post("/mood", data={"score": 5}, headers=other)
+
+    for limit in (1, 5, 10, 23, 100):
+        entries = await _pages(client, "/mood_history", headers, limit)
+        assert len(entries) == 23
+        assert len({entry["id"] for entry in entries}) == 23
+        keys = [(entry["created_at"], entry["id"]) for entry in entries]
+        assert keys == sorted(keys, reverse=True)
+
+
+async def test_last_page_has_no_cursor(client, user):
+    _, headers = user
+    for score in (3, 4):
+        await client.post("/mood", data={"score": score}, headers=headers)
+    page = (await client.get("/mood_history", params={"limit": 2}, headers=headers)).json()
+    assert len(page["items"]) == 2
+    assert page["next_cursor"] is None
+
+
+async def test_invalid_cursor(client, user):
+    _, headers = user
+    response = await client.get("/mood_history", params={"cursor": "not-a-cursor"}, headers=headers)
+    assert response.status_code == 400
+
+
+async def test_unchanged_history_is_not_modified(client, user):
+    _, headers = user
+    await client.post("/journal", data={"entry": "hello"}, headers=headers)
+    first = await client.get("/journal_history", headers=headers)
+    etag = first.headers["etag"]
+    again = await client.get("/journal_history", headers={**headers, "If-None-Match": etag})
+    assert again.status_code == 304
+
+    await client.post("/journal", data={"entry": "hello again"}, headers=headers)
+    changed = await client.get("/journal_history", headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert len(changed.json()["items"]) == 2
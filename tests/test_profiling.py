@@ -0,0 +1,63 @@
+import pytest
+
+from mentalhealth_app.business import profiling
+from mentalhealth_app.settings import settings
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def admin_token(monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", "s3cret")
+    return "s3cret"
+
+
+async def test_admin_endpoints_need_the_token(client, admin_token):
+    assert (await client.get("/admin/profiles", headers={"X-Admin-Token": admin_token})).status_code == 200
+    for token in ("wrong", "s3crét".encode("utf-8")):
+        response = await client.get("/admin/profiles", headers={"X-Admin-Token": token})
+        assert response.status_code == 403
+
+
+async def test_admin_endpoints_are_hidden_without_a_token(client):
+    assert (await client.get("/admin/profiles", headers={"X-Admin-Token": ""})).status_code == 404
+
+
+def test_profile_header_check(admin_token):
+    assert profiling._check_admin_token(admin_token)
+    assert not profiling._check_admin_token("s3crét")
+    assert not profiling._check_admin_token(None)
+
+
+async def test_profile_ids_include_the_pid(tmp_path, admin_token, monkeypatch):
+    ids = []
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            ids.append(dict(message["headers"])[b"x-profile-id"].decode())
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    # Two workers share the directory; their counters both start at 1
+    workers = [profiling.ProfilingMiddleware(app, directory=str(tmp_path)) for _ in range(2)]
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"x-profile", admin_token.encode())]}
+    for pid, worker in zip((101, 102), workers):
+        monkeypatch.setattr(profiling.os, "getpid", lambda: pid)
+        await worker(scope, receive, send)
+
+    assert len(set(ids)) == 2
+    assert [profile["id"] for profile in profiling.list_profiles(str(tmp_path))] == sorted(ids, reverse=True)
+    for profile_id in ids:
+        assert profiling.profile_path(profile_id, str(tmp_path))
+
+
+def test_profile_path_rejects_malformed_ids(tmp_path):
+    (tmp_path / "20240101-120000-1.prof").write_bytes(b"")
+    assert profiling.profile_path("20240101-120000-1", str(tmp_path))
+    for profile_id in ("../20240101-120000-1", "20240101-120000", "20240101-120000-1-2-3"):
+        assert profiling.profile_path(profile_id, str(tmp_path)) is None
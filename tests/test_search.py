@@ -0,0 +1,55 @@
+import pytest
+from sqlalchemy import text
+
+from mentalhealth_app.business import search
+from mentalhealth_app.data.database import engine
+
+from .conftest import register
+
+pytestmark = pytest.mark.anyio
+
+
+async def _journal(client, headers, *entries):
+    for entry in entries:
+        assert (await client.post("/journal", data={"entry": entry}, headers=headers)).status_code == 200
+
+
+async def test_search_only_sees_the_users_own_entries(client, user):
+    username, headers = user
+    _, other = await register(client)
+    await _journal(client, headers, "A long walk by the lake", "Walked to work", "Stayed in")
+    await _journal(client, other, *[f"Walking with friends, day {i}" for i in range(30)])
+
+    response = await client.get("/journal_search", params={"q": "walk", "limit": 1}, headers=headers)
+    first = response.json()
+    assert len(first["items"]) == 1
+    response = await client.get(
+        "/journal_search", params={"q": "walk", "limit": 1, "cursor": first["next_cursor"]}, headers=headers
+    )
+    second = response.json()
+    assert second["next_cursor"] is None
+    found = {item["entry"] for item in first["items"] + second["items"]}
+    assert found == {"A long walk by the lake", "Walked to work"}
+
+    # The full-text index itself only yields the user's rows - nobody else's are ranked
+    with engine.connect() as connection:
+        owner = connection.scalar(text("SELECT id FROM users WHERE username = :name"), {"name": username})
+        matched = connection.scalar(
+            text("SELECT count(*) FROM journal_fts WHERE journal_fts MATCH :query"),
+            {"query": search.user_fts_query(owner, "walk")},
+        )
+    assert matched == 2
+
+
+async def test_search_follows_edits_and_deletes(client, user):
+    _, headers = user
+    await _journal(client, headers, "Rainy afternoon")
+    entry_id = (await client.get("/journal_history", headers=headers)).json()["items"][0]["id"]
+    with engine.begin() as connection:
+        connection.execute(text("UPDATE journal_entries SET entry = 'Sunny afternoon' WHERE id = :id"), {"id": entry_id})
+    assert (await client.get("/journal_search", params={"q": "rainy"}, headers=headers)).json()["items"] == []
+    assert len((await client.get("/journal_search", params={"q": "sunny"}, headers=headers)).json()["items"]) == 1
+
+    with engine.begin() as connection:
+        connection.execute(text("DELETE FROM journal_entries WHERE id = :id"), {"id": entry_id})
+    assert (await client.get("/journal_search", params={"q": "sunny"}, headers=headers)).json()["items"] == []
@@ -0,0 +1,38 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize("token", ["abc.é", "é.abc", "not-a-token", "YWJj.", ""])
+async def test_malformed_tokens_are_rejected(client, token):
+    response = await client.get("/dashboard", headers={"Authorization": f"Bearer {token}".encode("utf-8")})
+    assert response.status_code == 401
+
+
+async def test_tokens_are_accepted_until_logout(client, user):
+    _, headers = user
+    assert (await client.get("/dashboard", headers=headers)).status_code == 200
+    assert (await client.post("/logout", headers=headers)).status_code == 200
+    assert (await client.get("/dashboard", headers=headers)).status_code == 401
+
+
+async def test_password_change_made_on_another_worker(client, user):
+    from mentalhealth_app.business import sessions
+
+    username, _ = user
+    response = await client.post("/login", data={"username": username, "password": "secret-password"})
+    user_id = response.json()["user_id"]
+    old_headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    stale = sessions.user_cache.get(user_id)
+    assert stale is not None
+
+    response = await client.post(
+        "/change_password", data={"old_password": "secret-password", "new_password": "changed"}, headers=old_headers
+    )
+    assert response.status_code == 200
+    new_headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    # This process still holds the record from before the change, like another worker would
+    sessions.user_cache.set(user_id, stale)
+    assert (await client.get("/dashboard", headers=new_headers)).status_code == 200
+    assert (await client.get("/dashboard", headers=old_headers)).status_code == 401
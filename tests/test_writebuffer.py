@@ -0,0 +1,68 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from mentalhealth_app.business.writebuffer import WriteBuffer
+
+pytestmark = pytest.mark.anyio
+
+
+def _mood(score, client_key=None):
+    return {"score": score, "notes": None, "created_at": datetime.utcnow(), "client_key": client_key}
+
+
+async def test_one_bad_entry_only_fails_its_own_request(client):
+    flushed = []
+
+    async def on_flush(by_user):
+        flushed.append(by_user)
+
+    buffer = WriteBuffer(max_delay=0.05, durable=True, on_flush=on_flush)
+    # The second entry breaks the unique (user_id, client_key) index, failing the grouped insert
+    results = await asyncio.gather(
+        buffer.submit("mood", 9001, _mood(3, "same")),
+        buffer.submit("mood", 9001, _mood(4, "same")),
+        buffer.submit("mood", 9002, _mood(5)),
+        buffer.submit("journal", 9002, {"entry": "fine", "created_at": datetime.utcnow()}),
+        return_exceptions=True,
+    )
+    await buffer.close()
+
+    assert results[0].score == 3
+    assert isinstance(results[1], IntegrityError)
+    assert results[2].score == 5
+    assert results[3].entry == "fine"
+    written = {user_id: {kind: len(rows) for kind, rows in kinds.items()} for b in flushed for user_id, kinds in b.items()}
+    assert written == {9001: {"mood": 1}, 9002: {"mood": 1, "journal": 1}}
+
+
+async def test_relaxed_mode_reports_failures(client):
+    failed = []
+
+    async def on_failed(by_user):
+        failed.append(by_user)
+
+    buffer = WriteBuffer(max_delay=0.05, durable=False, on_failed=on_failed)
+    assert await buffer.submit("mood", 9003, _mood(3, "dup")) is None
+    assert await buffer.submit("mood", 9003, _mood(4, "dup")) is None
+    await buffer.close()
+
+    assert len(failed) == 1
+    [(kind, values, exc)] = failed[0][9003]
+    assert kind == "mood" and values["score"] == 4
+    assert isinstance(exc, IntegrityError)
+
+
+async def test_relaxed_failures_are_published_to_the_user():
+    from mentalhealth_app.business import app, pubsub
+
+    queue = pubsub.broker.subscribe(9004)
+    try:
+        await app.publish_failed({9004: [("mood", _mood(4, "dup"), IntegrityError("insert", {}, None))]})
+        message = queue.get_nowait()
+    finally:
+        pubsub.broker.unsubscribe(9004, queue)
+    assert message["event"] == "write_failed"
+    assert message["data"][0]["type"] == "mood" and message["data"][0]["score"] == 4